@@ -0,0 +1,194 @@
+"""
+WebDriver round trips and wall time of the Browser hot paths
+
+Runs get_slots, generate_message, navigate_route, save_cart,
+select_payment_method and checkout against FakeDriver fixture pages of
+increasing size.
+Each WebDriver command is a round trip to chromedriver in real use, so the
+command counts are compared against a baseline file and any increase fails
+the run. Jitter delays are disabled, so wall times measure local work only.
+Run from the project root:
+
+    python -m benchmarks.hot_paths
+    python -m benchmarks.hot_paths --update-baseline
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import tempfile
+from statistics import median
+from time import perf_counter
+from types import SimpleNamespace
+
+import deliverance
+from config import BASE_URL
+from deliverance import Browser, NavCallables
+from deliverance.checkout import CheckoutEngine
+from deliverance.prefs import get_prefs_from_conf, SlotPrefMatcher
+from deliverance.shortcuts import ShortcutStore
+from tests.fake_driver import FakeDriver
+from tests.fixtures import site_pages
+
+BASELINE = os.path.join(os.path.dirname(__file__), 'baseline.json')
+SLOT_PATH = 'gp/buy/shipoptionselect/handlers/display.html'
+PAYMENT_PATH = 'gp/buy/payselect/handlers/display.html'
+SERVICE = 'Whole Foods'
+PREFS = {'Any': ['Any']}
+
+
+def make_browser(pages, start, extract='element'):
+    args = SimpleNamespace(
+        service=SERVICE, checkout=False, ignore_oos=False, save_cart=False,
+        extract=extract, fingerprint=False, http_poll=False, lean=False,
+        history=None, shortcuts=False, rate_limit=False,
+        debug=False
+    )
+    browser = Browser(FakeDriver(pages, BASE_URL, start), args)
+    browser.notifier.close()
+    browser.slot_prefs = get_prefs_from_conf(conf=PREFS)
+    browser.slot_matcher = SlotPrefMatcher(browser.slot_prefs)
+    return browser
+
+
+def bench_get_slots(size, slot_type, extract):
+    browser = make_browser(site_pages(SERVICE, slot_type, n_slots=size),
+                           SLOT_PATH, extract)
+    browser.get_slots()
+    return browser, browser.get_slots
+
+
+def bench_generate_message(size, slot_type, extract):
+    browser, get_slots = bench_get_slots(size, slot_type, extract)
+    slots = get_slots()
+    return browser, lambda: browser.generate_message(slots)
+
+
+def bench_navigate_route(size, _, mode):
+    browser = make_browser(site_pages(SERVICE, n_items=size), '')
+    if mode == 'shortcut':
+        # Runs in a temporary working directory
+        browser.shortcuts = ShortcutStore('route_shortcuts.json')
+    return browser, lambda: browser.navigate_route('SLOT_SELECT')
+
+
+def bench_save_cart(size, _, extract):
+    browser = make_browser(site_pages(SERVICE, n_items=size), '', extract)
+    return browser, browser.save_cart
+
+
+def bench_select_payment_method(size, _, extract):
+    browser = make_browser(site_pages(SERVICE, n_cards=size), PAYMENT_PATH,
+                           extract)
+    conf = {'preferred_card': '{:04d}'.format(1000 + size - 1)}
+    return browser, lambda: NavCallables.select_payment_method(
+        browser, conf=conf
+    )
+
+
+def bench_checkout(size, slot_type, extract):
+    browser, get_slots = bench_get_slots(size, slot_type, extract)
+    slots = get_slots()
+    return browser, lambda: CheckoutEngine(browser, slots).run()
+
+
+# (name, setup, slot types, extract modes)
+HOT_PATHS = [
+    ('get_slots', bench_get_slots, ['single', 'multi'],
+     ['element', 'script', 'lxml']),
+    ('generate_message', bench_generate_message, ['single', 'multi'],
+     ['element', 'script', 'lxml']),
+    ('navigate_route', bench_navigate_route, [None], ['click', 'shortcut']),
+    ('save_cart', bench_save_cart, [None], ['element', 'lxml']),
+    ('select_payment_method', bench_select_payment_method, [None],
+     ['element', 'lxml']),
+    ('checkout', bench_checkout, ['single', 'multi'],
+     ['element', 'script']),
+]
+
+
+def run(setup, size, slot_type, extract, repeat):
+    """Return (round trips, median seconds) of the measured call"""
+    times = []
+    trips = None
+    for _ in range(repeat):
+        browser, call = setup(size, slot_type, extract)
+        browser.driver.reset_counts()
+        t = perf_counter()
+        call()
+        times.append(perf_counter() - t)
+        trips = browser.driver.round_trips
+    return trips, median(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[5, 25, 100])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--paths', nargs='+',
+                        choices=[p[0] for p in HOT_PATHS],
+                        default=[p[0] for p in HOT_PATHS])
+    parser.add_argument('--baseline', default=BASELINE)
+    parser.add_argument('--update-baseline', action='store_true',
+                        help='Write the measured round trips as the baseline')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.CRITICAL)
+    # Measure local work, not the human-like delays between clicks
+    deliverance.jitter = lambda seconds: None
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    results = {}
+    regressions = []
+    cwd = os.getcwd()
+    print('{:<40} {:>6} {:>9} {:>9} {:>10}'.format(
+        'hot path', 'size', 'trips', 'baseline', 'ms'
+    ))
+    with tempfile.TemporaryDirectory() as tmp:
+        # save_cart appends to a cart history in the working directory
+        os.chdir(tmp)
+        try:
+            for name, setup, slot_types, extracts in HOT_PATHS:
+                if name not in args.paths:
+                    continue
+                for slot_type in slot_types:
+                    for extract in extracts:
+                        label = '/'.join(
+                            x for x in [name, slot_type, extract] if x
+                        )
+                        for size in args.sizes:
+                            key = '{}/{}'.format(label, size)
+                            trips, elapsed = run(setup, size, slot_type,
+                                                 extract, args.repeat)
+                            results[key] = trips
+                            expected = baseline.get(key)
+                            flag = ''
+                            if expected is not None and trips > expected:
+                                regressions.append(key)
+                                flag = '  REGRESSION'
+                            print('{:<40} {:>6} {:>9} {:>9} {:>10.2f}{}'
+                                  .format(label, size, trips,
+                                          '-' if expected is None
+                                          else expected,
+                                          elapsed * 1000, flag))
+        finally:
+            os.chdir(cwd)
+
+    if args.update_baseline:
+        baseline.update(results)
+        with open(args.baseline, 'w') as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+            f.write('\n')
+        print('Baseline written to {}'.format(args.baseline))
+    elif regressions:
+        print('\n{} round trip regression(s):\n  {}'.format(
+            len(regressions), '\n  '.join(regressions)
+        ))
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
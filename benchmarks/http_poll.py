@@ -0,0 +1,106 @@
+"""
+HTTP polling against a local stand-in Amazon server
+
+Serves fixture slot pages (and auth / throttle redirects) locally, then
+measures HttpPoller fetch + parse latency and checks that redirects raise
+PollFallback. Run from the project root:
+
+    python -m benchmarks.http_poll
+"""
+import argparse
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from statistics import mean, median
+from time import perf_counter
+
+from config import SiteConfig
+from deliverance.exceptions import PollFallback
+from deliverance.http_poll import HttpPoller
+from tests.fixtures import slot_page
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        server = self.server
+        server.requests.append(self.path)
+        if not self.path.startswith('/gp/buy/shipoptionselect'):
+            return self.respond('<html><body></body></html>')
+        elif server.mode == 'auth':
+            return self.redirect('/ap/signin')
+        elif server.mode == 'throttle':
+            return self.redirect('/throttle.html')
+        elif server.mode == 'expired':
+            return self.respond('<html><body>Sign in</body></html>')
+        self.respond(server.body)
+
+    def redirect(self, location):
+        self.send_response(302)
+        self.send_header('Location', location)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def respond(self, body):
+        body = body.encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_server(body):
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StandInHandler)
+    server.requests = []
+    server.mode = 'ok'
+    server.body = body
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--count', type=int, default=50)
+    parser.add_argument('--slot-type', choices=['single', 'multi'],
+                        default='single')
+    parser.add_argument('--slots', type=int, nargs='+', default=[0, 10, 80])
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.ERROR)
+
+    server = start_server('')
+    poller = HttpPoller(
+        SiteConfig('Whole Foods'),
+        base_url='http://127.0.0.1:{}/'.format(server.server_port)
+    )
+    poller.load_cookies([{'name': 'session-id', 'value': 'bench'}])
+    print('{:>6} {:>10} {:>10} {:>10}'.format(
+        'slots', 'mean ms', 'median ms', 'found'
+    ))
+    for n in args.slots:
+        server.body = slot_page(args.slot_type, n)
+        latencies = []
+        for _ in range(args.count):
+            t = perf_counter()
+            slots = poller.get_slots()
+            latencies.append((perf_counter() - t) * 1000)
+        print('{:>6} {:>10.2f} {:>10.2f} {:>10}'.format(
+            n, mean(latencies), median(latencies), len(slots)
+        ))
+    for mode in ['auth', 'throttle', 'expired']:
+        server.mode = mode
+        try:
+            poller.get_slots()
+            print('{:>9}: no fallback (unexpected)'.format(mode))
+        except PollFallback as e:
+            print('{:>9}: fallback ({})'.format(mode, e.msg))
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+"""
+Notification latency against a local stand-in Telegram server
+
+Sends a series of messages through `send_telegram` (pooled, keep-alive
+session) and through one-off `requests.get` calls, and reports latency per
+send as seen by the client and the server. Run from the project root:
+
+    python -m benchmarks.notify
+"""
+import argparse
+import json
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from statistics import mean, median
+from time import perf_counter, sleep
+
+import requests
+
+from deliverance.notify import send_telegram, telegram_url, HTTP_TIMEOUT
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+    latency = 0
+
+    def do_GET(self):
+        self.server.requests.append((perf_counter(), self.path))
+        if self.latency:
+            sleep(self.latency)
+        body = json.dumps({'ok': True, 'result': {}}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_server(latency=0):
+    handler = type('Handler', (StandInHandler,), {'latency': latency})
+    server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    server.requests = []
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def unpooled_send(body, conf):
+    return requests.get(
+        telegram_url(conf, 'sendMessage'),
+        params={'chat_id': conf['chat_id'], 'text': body},
+        timeout=HTTP_TIMEOUT
+    ).json()
+
+
+def run(send, conf, count):
+    latencies = []
+    for i in range(count):
+        t = perf_counter()
+        send('Benchmark message {}'.format(i), conf=conf)
+        latencies.append((perf_counter() - t) * 1000)
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--count', type=int, default=50)
+    parser.add_argument('--server-latency', type=float, default=0,
+                        help='Simulated server processing time (s)')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    server = start_server(args.server_latency)
+    conf = {
+        'token': 'bench',
+        'chat_id': '1',
+        'api_url': 'http://127.0.0.1:{}'.format(server.server_port)
+    }
+    print('{:>10} {:>10} {:>10} {:>10} {:>10}'.format(
+        'client', 'first ms', 'mean ms', 'median ms', 'max ms'
+    ))
+    for name, send in [('unpooled', unpooled_send),
+                       ('pooled', send_telegram)]:
+        latencies = run(send, conf, args.count)
+        print('{:>10} {:>10.2f} {:>10.2f} {:>10.2f} {:>10.2f}'.format(
+            name, latencies[0], mean(latencies), median(latencies),
+            max(latencies)
+        ))
+    print('Server recorded {} requests'.format(len(server.requests)))
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,133 @@
+"""
+Polling schedule simulation
+
+Replays a synthetic slot release schedule against the fixed
+jitter(INTERVAL) loop and the adaptive PollScheduler, and reports mean
+time-to-detect, missed releases, polls per hour and throttles. Run from
+the project root:
+
+    python -m benchmarks.polling
+"""
+import argparse
+import logging
+import random
+from collections import deque
+from datetime import datetime, timedelta
+from statistics import mean
+
+from config import INTERVAL
+from deliverance.scheduler import PollScheduler
+from deliverance.utils import jittered
+
+START = datetime(2020, 4, 1)
+
+
+def release_schedule(days, times, spread, extra, seed=0):
+    """Release datetimes: the given times of day (± spread minutes) plus
+    `extra` random releases per day"""
+    rng = random.Random(seed)
+    releases = []
+    for day in range(days):
+        base = START + timedelta(days=day)
+        for t in times:
+            hours, minutes = (int(x) for x in t.split(':'))
+            releases.append(base + timedelta(
+                hours=hours, minutes=minutes + rng.uniform(-spread, spread)
+            ))
+        for _ in range(extra):
+            releases.append(base + timedelta(seconds=rng.uniform(0, 86400)))
+    return sorted(releases)
+
+
+class FixedPolicy:
+    def next_interval(self, now):
+        return jittered(INTERVAL)
+
+    def record_poll(self, found, when):
+        pass
+
+    def record_throttle(self):
+        pass
+
+
+def simulate(policy, releases, days, lifetime, throttle_limit, throttle_pause):
+    end = START + timedelta(days=days)
+    now = START
+    pending = deque(releases)
+    open_slots = []
+    detect_times = []
+    missed = 0
+    polls = 0
+    throttles = 0
+    recent = deque()
+    while now < end:
+        while pending and pending[0] <= now:
+            open_slots.append(pending.popleft())
+        expired = [r for r in open_slots
+                   if now > r + timedelta(seconds=lifetime)]
+        missed += len(expired)
+        open_slots = [r for r in open_slots if r not in expired]
+        polls += 1
+        recent.append(now)
+        while recent and recent[0] < now - timedelta(hours=1):
+            recent.popleft()
+        if len(recent) > throttle_limit:
+            throttles += 1
+            recent.clear()
+            policy.record_throttle()
+            now += timedelta(seconds=throttle_pause)
+            continue
+        found = bool(open_slots)
+        for release in open_slots:
+            detect_times.append((now - release).total_seconds())
+        open_slots = []
+        policy.record_poll(found, now)
+        now += timedelta(seconds=policy.next_interval(now))
+    return {
+        'mean_ttd_s': mean(detect_times) if detect_times else float('nan'),
+        'detected': len(detect_times),
+        'missed': missed,
+        'polls_per_hour': polls / (days * 24),
+        'throttles': throttles
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--days', type=int, default=14)
+    parser.add_argument('--release-times', nargs='+',
+                        default=['06:00', '13:15', '23:30'])
+    parser.add_argument('--spread', type=float, default=4,
+                        help='Release time variation (minutes)')
+    parser.add_argument('--extra', type=int, default=1,
+                        help='Random releases per day')
+    parser.add_argument('--lifetime', type=float, default=90,
+                        help='Seconds a released slot stays available')
+    parser.add_argument('--throttle-limit', type=int, default=200,
+                        help='Polls per hour that trigger a throttle')
+    parser.add_argument('--throttle-pause', type=float, default=300)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.ERROR)
+    random.seed(args.seed)
+
+    releases = release_schedule(args.days, args.release_times, args.spread,
+                                args.extra, args.seed)
+    policies = [
+        ('fixed', FixedPolicy()),
+        ('adaptive', PollScheduler(conf={})),
+    ]
+    print('{:>10} {:>12} {:>9} {:>7} {:>11} {:>10}'.format(
+        'policy', 'mean ttd s', 'detected', 'missed', 'polls/hr', 'throttles'
+    ))
+    for name, policy in policies:
+        result = simulate(policy, releases, args.days, args.lifetime,
+                          args.throttle_limit, args.throttle_pause)
+        print('{:>10} {:>12.1f} {:>9} {:>7} {:>11.1f} {:>10}'.format(
+            name, result['mean_ttd_s'], result['detected'], result['missed'],
+            result['polls_per_hour'], result['throttles']
+        ))
+
+
+if __name__ == '__main__':
+    main()
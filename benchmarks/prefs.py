@@ -0,0 +1,77 @@
+"""
+Micro-benchmark for slot preference matching
+
+Compares the original O(prefs x slots) loop against SlotPrefMatcher over
+synthetic slot lists. Run from the project root:
+
+    python -m benchmarks.prefs
+"""
+import argparse
+import logging
+import random
+from timeit import Timer
+
+from deliverance.prefs import (clean_slotname, get_prefs_from_conf,
+                               SlotPrefMatcher)
+
+DAYS = ['Today', 'Tomorrow', 'Wednesday', 'Thursday', 'Friday', 'Saturday',
+        'Sunday']
+WINDOWS = ['{}:00 {} - {}:00 {}'.format(h % 12 or 12, 'AM' if h < 12 else 'PM',
+                                        (h + 2) % 12 or 12,
+                                        'AM' if h + 2 < 12 else 'PM')
+           for h in range(6, 22)]
+CONF = {
+    'Any': ['11:00 AM - 1:00 PM', '7:00 PM - 9:00 PM'],
+    'today': ['1:00 PM - 3:00 PM', '3:00 PM - 5:00 PM'],
+    'tomorrow': ['Any'],
+    'Friday': ['9:00 AM - 11:00 AM']
+}
+
+
+def synthetic_slots(n, seed=0):
+    rng = random.Random(seed)
+    return ['::'.join([rng.choice(DAYS), rng.choice(WINDOWS)])
+            for _ in range(n)]
+
+
+def legacy_match(prefs, slots):
+    preferred_slots = []
+    for cmp in prefs:
+        for s in slots:
+            if cmp.startswith('any'):
+                if cmp.replace('any', '') in clean_slotname(s):
+                    preferred_slots.append(s)
+            else:
+                if clean_slotname(s).startswith(cmp):
+                    preferred_slots.append(s)
+    return preferred_slots
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--sizes', type=int, nargs='+',
+                        default=[10, 100, 1000, 10000])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    prefs = get_prefs_from_conf(conf=CONF)
+    matcher = SlotPrefMatcher(prefs)
+    print('{:>8} {:>12} {:>12} {:>8} {:>10} {:>10}'.format(
+        'slots', 'legacy ms', 'matcher ms', 'speedup', 'legacy n', 'matcher n'
+    ))
+    for size in args.sizes:
+        slots = synthetic_slots(size)
+        number = max(1, 10000 // size)
+        legacy = min(Timer(lambda: legacy_match(prefs, slots)).repeat(
+            args.repeat, number)) / number
+        compiled = min(Timer(lambda: matcher.match(slots, slots)).repeat(
+            args.repeat, number)) / number
+        print('{:>8} {:>12.3f} {:>12.3f} {:>7.1f}x {:>10} {:>10}'.format(
+            size, legacy * 1000, compiled * 1000, legacy / compiled,
+            len(legacy_match(prefs, slots)), len(matcher.match(slots, slots))
+        ))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,19 +1,98 @@
+import logging
+import os
+import threading
+from time import perf_counter
 from selenium.webdriver.common.by import By
 import toml
 
-CONF_PATH = 'conf.toml'
+log = logging.getLogger(__name__)
+
+
+class ConfCache:
+    """
+    Process-wide cache of the parsed config file
+
+    The file is only parsed again when its mtime or size changes. If an edit
+    can't be parsed, the last valid config is kept until the file changes
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.version = 0
+        self.hits = 0
+        self.loads = 0
+        self.parse_time = 0
+        self._conf = None
+        self._key = None
+        self._lock = threading.Lock()
+
+    def load(self):
+        stat = os.stat(self.path)
+        key = (stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            if key == self._key:
+                self.hits += 1
+                return self._conf
+            t = perf_counter()
+            try:
+                conf = toml.load(self.path)
+            except Exception:
+                if self._conf is None:
+                    raise
+                log.error("Failed to parse '{}', keeping previous "
+                          "config".format(self.path), exc_info=True)
+                self._key = key
+                return self._conf
+            elapsed = perf_counter() - t
+            self.parse_time += elapsed
+            self.loads += 1
+            self.version += 1
+            self._conf = conf
+            self._key = key
+            log.debug("Parsed '{}' in {:.1f}ms (version {})".format(
+                self.path, elapsed * 1000, self.version
+            ))
+            return conf
+
+    def current_version(self):
+        """Reload the file if it has changed and return the config version"""
+        try:
+            self.load()
+        except Exception:
+            return None
+        return self.version
+
+    def stats(self):
+        return {
+            'loads': self.loads,
+            'hits': self.hits,
+            'parse_time_ms': round(self.parse_time * 1000, 2)
+        }
+
+
+# Overridable per process, e.g. for supervisor workers
+CONF_PATH = os.environ.get('DELIVERANCE_CONF', 'conf.toml')
 USER_DATA_DIR = 'chrome-user-data'
+STATE_DIR = os.environ.get('DELIVERANCE_STATE_DIR', '')
+SHORTCUTS_PATH = os.path.join(STATE_DIR, 'route_shortcuts.json')
+CART_HISTORY_PATH = os.path.join(STATE_DIR, 'cart_history.jsonl')
+# Shared by every process started from the same directory
+RATE_LIMIT_PATH = 'rate_limit.json'
+DAEMON_SOCKET = 'deliverance.sock'
 BASE_URL = 'https://www.amazon.com/'
+conf_cache = ConfCache(CONF_PATH)
 try:
-    options = toml.load(CONF_PATH)['options']
+    options = conf_cache.load()['options']
     if options.get('use_smile'):
         BASE_URL = 'https://smile.amazon.com/'
     if options.get('chrome_data_dir'):
         USER_DATA_DIR = options['chrome_data_dir']
 except Exception:
     pass
+USER_DATA_DIR = os.environ.get('DELIVERANCE_PROFILE', USER_DATA_DIR)
 
 NAV_TIMEOUT = 20
+ROUTE_RETRIES = 3
 INTERVAL = 25
 
 VALID_SERVICES = [
@@ -25,6 +104,8 @@ VALID_SERVICES = [
 class Patterns:
     AUTH_URL = BASE_URL + 'ap/'
     NOT_LOGGED_IN = "Hello, Sign in"
+    # Session cookies only set once signed in
+    LOGIN_COOKIES = ['at-main', 'x-main', 'sess-at-main']
     OOS_URL = 'gp/buy/itemselect/handlers/display.html'
     OOS = "This item is no longer available"
     THROTTLE_URL = 'throttle.html'
@@ -34,9 +115,12 @@ class Patterns:
 class Locators:
     LOGIN = (By.ID, 'nav-link-accountList')
     OOS_ITEM = (By.XPATH, "//*[contains(@class, ' item-row')]")
+    OOS_ITEM_ASIN = (By.XPATH, ".//*[starts-with(@name, 'asin')]")
     OOS_CONTINUE = (By.XPATH, "//*[@name='continue-bottom']")
     CART_ITEMS = (By.XPATH, "//div[@data-name='Active Items']"
                             "/*[contains(@class, 'sc-list-item')]")
+    CART_EMPTY = (By.XPATH, "//*[contains(@class, "
+                            "'sc-your-amazon-cart-is-empty')]")
     THROTTLE_CONTINUE = (By.XPATH, "//*[contains(@id, 'throttle') and "
                                    "@role='button']")
     PAYMENT_ROW = (By.XPATH, "//*[starts-with(@class, 'payment-row')]")
@@ -86,6 +170,11 @@ class SiteConfig:
         self.routes = {}
         self.routes['SLOT_SELECT'] = {
             'route_start': BASE_URL,
+            # With --shortcut, try loading the last waypoint's URL directly
+            # first. That URL is the same for every service, so it only
+            # counts if the page shows this element
+            'shortcut': (By.XPATH,
+                         "//*[contains(text(), '{}')]".format(service)),
             'waypoints': [
                 (
                     (By.ID, 'nav-cart'),
@@ -1,57 +1,70 @@
 import logging
-from concurrent.futures import ThreadPoolExecutor
-from selenium.common.exceptions import TimeoutException
+from collections import Counter
+from time import perf_counter, sleep
+from selenium.common.exceptions import TimeoutException, WebDriverException
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 
-from config import SiteConfig, SlotLocators, INTERVAL, NAV_TIMEOUT
+from config import (SiteConfig, SlotLocators, NAV_TIMEOUT, ROUTE_RETRIES,
+                    SHORTCUTS_PATH, CART_HISTORY_PATH, RATE_LIMIT_PATH,
+                    conf_cache)
 from .elements import SlotElement, SlotElementMulti, PaymentRow, CartItem
-from .exceptions import Redirect, RouteRedirect, NavigationException
+from .extract import extract_cart, extract_slots, slot_fingerprint
+from .parse import PageSnapshot
+from .prefs import check_prefs, get_prefs_from_conf, SlotPrefMatcher
+from .prefs import clean_slotname  # noqa: F401 (public API)
+from .exceptions import (Redirect, RouteRedirect, NavigationException,
+                         PollFallback, PollThrottled)
 from .redirect import wait_for_auth, handle_redirect
-from .notify import alert, annoy, send_sms, send_telegram
+from .routing import Router
+from .dispatch import Dispatcher
+from .chrome import chrome_rss
+from .metrics import LatencyStats, SkipStats, StartupTimer
+from .scheduler import PollScheduler
+from .shortcuts import ShortcutStore
+from .history import SlotHistory, observe, observe_name, release_minutes
+from . import instrument
+from .instrument import phase
+from .checkout import CheckoutEngine
+from .cart_store import CartStore
+from .login import LoginCache
+from .ratelimit import RateLimiter
+from .replay import SnapshotRecorder
 from .utils import (wait_for_elements, wait_for_element, remove_qs, dump_toml,
                     conf_dependent, jitter, click_when_enabled)
 
 log = logging.getLogger(__name__)
 
 
-def clean_slotname(slot_or_str):
-    if isinstance(slot_or_str, SlotElement):
-        name = slot_or_str.full_name
-    else:
-        name = slot_or_str
-    return name.lower().replace(' ', '')
-
-
-@conf_dependent('slot_preference')
-def get_prefs_from_conf(conf):
-    log.info('Reading slot preferences from conf: {}'.format(conf))
-    prefs = []
-    for day, windows in conf.items():
-        for window in windows:
-            if window.lower() == 'any':
-                if day.lower() == 'any':
-                    log.info("'Any' day, 'Any' time specified. "
-                             "Will look for first available slot")
-                    return None
-                prefs.append(day.lower())
-            else:
-                prefs.append(clean_slotname('::'.join([day, window])))
-    return prefs
-
-
 class NavCallables:
     @staticmethod
     @conf_dependent('options')
-    def select_payment_method(browser, conf):
+    def select_payment_method(browser, conf, extract=None):
+        browser.record_snapshot('payment')
         pref_card = conf.get('preferred_card')
         if not pref_card:
             log.warning('Preferred card not provided')
         else:
-            for element in browser.driver.find_elements(
-                *browser.Locators.PAYMENT_ROW
-            ):
-                card_row = PaymentRow(element)
+            # Look the card's row up directly before scanning every row
+            radios = browser.driver.find_elements_by_xpath(
+                PaymentRow.radio_xpath(browser.Locators.PAYMENT_ROW[1],
+                                       pref_card)
+            )
+            if radios:
+                log.info("Selecting card ending in '{}'".format(pref_card))
+                click_when_enabled(browser.driver, radios[0])
+                return
+            if (extract or browser.args.extract) == 'lxml':
+                card_rows = PageSnapshot.from_driver(
+                    browser.driver
+                ).payment_rows()
+            else:
+                card_rows = [
+                    PaymentRow(e) for e in browser.driver.find_elements(
+                        *browser.Locators.PAYMENT_ROW
+                    )
+                ]
+            for card_row in card_rows:
                 if card_row.card_number == pref_card:
                     log.info("Selecting card ending in '{}'".format(pref_card))
                     card_row.select()
@@ -78,10 +91,18 @@ class Waypoint:
 
 
 class Route:
-    def __init__(self, route_start, *args):
+    def __init__(self, route_start, *args, name=None, shortcut=None):
         self.route_start = route_start
         self.waypoints = args
+        self.name = name
+        self.shortcut = shortcut
         self.waypoints_reached = 0
+        # valid_dest[i]: dests of waypoint i and every waypoint after it
+        self.valid_dest = []
+        remaining = []
+        for waypoint in reversed(args):
+            remaining = waypoint.dest + remaining
+            self.valid_dest.insert(0, remaining)
 
     def __len__(self):
         return len(self.waypoints)
@@ -92,20 +113,84 @@ class Route:
 
 
 class Browser:
-    def __init__(self, driver, args):
+    def __init__(self, driver, args, startup=None):
         self.driver = driver
         self.args = args
-        self.site_config = SiteConfig(args.service)
+        self.startup = startup or StartupTimer()
+        self.prefs_override = None
+        self._prefs_version = -1
+        self.load_prefs()
+        self.notifier = Dispatcher()
+        self.refresh_latency = LatencyStats()
+        self.parse_latency = LatencyStats()
+        self.skip_stats = SkipStats()
+        self.history = None
+        if getattr(args, 'history', None):
+            self.history = SlotHistory(args.history)
+        self.snapshots = None
+        if getattr(args, 'record', None):
+            self.snapshots = SnapshotRecorder(args.record)
+        self.shortcuts = (ShortcutStore(SHORTCUTS_PATH)
+                          if args.shortcuts else None)
+        self.limiter = RateLimiter(RATE_LIMIT_PATH, enabled=args.rate_limit)
+        self.set_service(args.service)
+
+    def set_service(self, service):
+        """(Re)build everything that depends on the delivery service"""
+        self.site_config = SiteConfig(service)
+        self.args.service = service
         self.Locators = self.site_config.Locators
         self.Patterns = self.site_config.Patterns
-        self.slot_prefs = get_prefs_from_conf()
-        self.executor = None
+        self.scheduler = PollScheduler()
+        if self.history:
+            self.scheduler.releases.extend(
+                release_minutes(self.history.path, service)
+            )
+        self.http_poller = None
+        if self.args.http_poll:
+            from .http_poll import HttpPoller
+            self.http_poller = HttpPoller(self.site_config)
+        self.login = LoginCache(self.driver, self.Patterns.LOGIN_COOKIES)
         self.slot_type = None
+        self._last_fingerprint = None
+        self._last_slots = []
         self.build_routes()
 
     @property
     def current_url(self):
-        return remove_qs(self.driver.current_url)
+        url = remove_qs(self.driver.current_url)
+        if self.Patterns.AUTH_URL in url:
+            # Wherever it is seen, an auth page means the cached login is off
+            self.login.invalidate()
+        return url
+
+    def load_prefs(self):
+        """(Re)load slot preferences if the config file has changed"""
+        version = conf_cache.current_version()
+        if version == self._prefs_version:
+            return
+        if self._prefs_version != -1:
+            log.info('Config file changed. Reloading slot preferences')
+        self._prefs_version = version
+        if self.prefs_override is not None:
+            self.slot_prefs = get_prefs_from_conf(conf=self.prefs_override)
+        else:
+            self.slot_prefs = get_prefs_from_conf()
+        self.slot_matcher = SlotPrefMatcher(self.slot_prefs)
+
+    def set_prefs(self, prefs):
+        """
+        Use `prefs` (in the format of conf.toml's `slot_preference` section)
+        instead of the config file, or go back to the config file if None.
+        Raises ValueError (leaving the current preferences in place) if
+        `prefs` isn't in that format
+        """
+        if prefs is not None:
+            check_prefs(prefs)
+        self.prefs_override = prefs
+        self._prefs_version = -1
+        self._last_fingerprint = None
+        self.load_prefs()
 
     def build_routes(self):
         self.routes = {}
@@ -120,23 +205,46 @@ class Browser:
                 waypoints.append(w)
             self.routes[route_name] = Route(
                 route_dict['route_start'],
-                *waypoints
+                *waypoints,
+                name=route_name,
+                shortcut=route_dict.get('shortcut')
             )
+        self.router = Router(self.Patterns, self.routes)
 
-    def is_logged_in(self):
-        if self.current_url == self.site_config.BASE_URL:
-            try:
-                text = wait_for_element(self.driver, self.Locators.LOGIN).text
-                return self.Patterns.NOT_LOGGED_IN not in text
-            except Exception:
-                return False
-        elif self.Patterns.AUTH_URL in self.current_url:
+    def is_logged_in(self, current=None, wait=True):
+        """
+        Check the login state
+
+        On BASE_URL the account link is read, and the result is cached
+        against the login cookies, so it is only read again once they
+        change. Amazon can keep those cookies while asking to log in
+        again, so they never stand in for the check itself.
+        wait: Wait for the account link to appear, if reading it
+        """
+        current = remove_qs(current) if current else self.current_url
+        if self.router.classify(current).kind == 'auth':
+            self.login.invalidate()
             return False
-        else:
+        if current != self.site_config.BASE_URL:
             # Lazily assume true if we are anywhere but BASE_URL / AUTH pattern
             return True
+        state, key = self.login.lookup()
+        if state is not None:
+            return state
+        try:
+            if wait:
+                link = wait_for_element(self.driver, self.Locators.LOGIN)
+            else:
+                link = self.driver.find_elements(*self.Locators.LOGIN)[0]
+            state = self.Patterns.NOT_LOGGED_IN not in link.text
+        except Exception:
+            return False
+        self.login.store(state, key)
+        return state
 
+    @phase('navigate_waypoint')
     def navigate_waypoint(self, waypoint, timeout, valid_dest):
+        """Click through `waypoint` and return the URL navigated to"""
         if callable(waypoint.callable):
             log.info('Executing {}() before navigation'.format(
                 waypoint.callable.__name__
@@ -144,59 +252,129 @@ class Browser:
             waypoint.callable(browser=self)
         log.info('Navigating ' + str(waypoint))
         elem = wait_for_element(self.driver, waypoint.locator, timeout=timeout)
+        self.limiter.acquire('click')
         jitter(.4)
         click_when_enabled(self.driver, elem)
         try:
             WebDriverWait(self.driver, timeout).until(EC.staleness_of(elem))
         except TimeoutException:
             pass
-        if waypoint.check_current(self.current_url):
-            log.info("Navigated to '{}'".format(
-                waypoint.check_current(self.current_url)
-            ))
-        elif valid_dest and any(d in self.current_url for d in valid_dest):
-            log.info("Navigated to valid dest '{}'".format(self.current_url))
+        current = self.current_url
+        dest = waypoint.check_current(current)
+        if dest:
+            log.info("Navigated to '{}'".format(dest))
+        elif valid_dest and any(d in current for d in valid_dest):
+            log.info("Navigated to valid dest '{}'".format(current))
         else:
             raise NavigationException(
                 "Navigation to '{}' failed".format(waypoint.dest)
             )
+        return current
 
-    def navigate_route(self, route, retry=False, timeout=NAV_TIMEOUT):
+    def navigate_route(self, route, retry=False, timeout=NAV_TIMEOUT,
+                       max_retries=ROUTE_RETRIES, on_waypoint=None):
+        """
+        Navigate to the end of `route`. If `retry` is set, the route is
+        started over (up to `max_retries` times) on a RouteRedirect
+
+        on_waypoint: Called with each waypoint as it is reached
+        """
         if isinstance(route, str):
             route = self.routes.get(route)
+        attempts = 0
+        while True:
+            try:
+                self.follow_route(route, timeout, on_waypoint)
+                return
+            except RouteRedirect:
+                attempts += 1
+                if not retry or attempts > max_retries:
+                    raise
+                log.warning('Retrying route ({}/{})'.format(
+                    attempts, max_retries
+                ))
+
+    def follow_route(self, route, timeout, on_waypoint=None):
         log.info('Navigating ' + str(route))
         route.waypoints_reached = 0
-        if self.current_url != route.route_start:
+        if self.try_shortcut(route):
+            return
+        current = self.current_url
+        if current != route.route_start:
             log.info('Navigating to route start: {}'.format(route.route_start))
+            self.limiter.acquire('get')
             jitter(.4)
             self.driver.get(route.route_start)
-        for waypoint in route.waypoints:
+            current = self.current_url
+        while route.waypoints_reached < len(route):
+            i = route.waypoints_reached
+            position = self.router.position(route, current)
+            if position is not None and position >= i:
+                log.warning("Already at dest: '{}'".format(current))
+                route.waypoints_reached = position + 1
+                continue
             try:
-                valid_dest = []
-                for w in route.waypoints[route.waypoints.index(waypoint):]:
-                    valid_dest.extend(w.dest)
-                if waypoint.check_current(self.current_url):
-                    log.warning("Already at dest: '{}'".format(
-                        waypoint.check_current(self.current_url)
-                    ))
-                else:
-                    self.navigate_waypoint(waypoint, timeout, valid_dest)
+                current = self.navigate_waypoint(route.waypoints[i], timeout,
+                                                 route.valid_dest[i])
             except NavigationException:
-                try:
-                    handle_redirect(self,
-                                    valid_dest=valid_dest,
-                                    timeout=timeout,
-                                    route=route)
-                except RouteRedirect:
-                    if retry:
-                        log.warning('Retrying route')
-                        self.navigate_route(route, timeout=timeout)
-                        return
-                    else:
-                        raise
-            route.waypoints_reached += 1
+                handle_redirect(self,
+                                valid_dest=route.valid_dest[i],
+                                timeout=timeout,
+                                route=route)
+                current = self.current_url
+            route.waypoints_reached = i + 1
+            if on_waypoint:
+                on_waypoint(route.waypoints[i])
         log.info('Route complete')
 
+    def try_shortcut(self, route):
+        """
+        Load the route's final waypoint URL directly, if this has worked
+        before (or hasn't been tried). Returns True if it worked and the
+        page is for the current service
+        """
+        if not (self.shortcuts and route.shortcut):
+            return False
+        service = self.site_config.service
+        if not self.shortcuts.should_try(service, route.name):
+            return False
+        last = route.waypoints[-1]
+        if last.check_current(self.current_url):
+            if self.driver.find_elements(*route.shortcut):
+                route.waypoints_reached = len(route)
+                return True
+            # Another service's page (e.g. after set_service). Only the
+            # route picks the service
+            return False
+        url = self.site_config.BASE_URL + last.dest[0]
+        log.info('Trying shortcut: {}'.format(url))
+        self.limiter.acquire('get')
+        jitter(.4)
+        self.driver.get(url)
+        current = self.current_url
+        if last.check_current(current):
+            if self.driver.find_elements(*route.shortcut):
+                log.info("Shortcut to '{}' worked".format(last.dest[0]))
+                self.shortcuts.record(service, route.name, url, True)
+                route.waypoints_reached = len(route)
+                return True
+            log.warning("Shortcut reached another service's page. "
+                        "Navigating route")
+            self.shortcuts.record(service, route.name, url, False)
+            return False
+        log.warning("Shortcut redirected to '{}'. Navigating route".format(
+            current
+        ))
+        # Auth, OOS and throttle redirects aren't the shortcut's fault
+        if self.router.classify(current).kind in ['auth', 'oos', 'throttle']:
+            try:
+                handle_redirect(self)
+            except RouteRedirect:
+                pass
+        else:
+            self.shortcuts.record(service, route.name, url, False)
+        return False
+
     def determine_slot_type(self):
         log.info('Determining delivery slot type')
         if self.driver.find_elements(*SlotLocators('multi').CONTAINER):
@@ -207,7 +385,18 @@ class Browser:
             self.slot_type = 'single'
             self.slot_cls = SlotElement
 
-    def get_slots(self, timeout=5):
+    @phase('get_slots')
+    def get_slots(self, timeout=5, extract=None):
+        """
+        Return available (and preferred, if specified) delivery slots
+
+        extract: 'element' to wrap each slot in a SlotElement, 'script' to
+                 collect plain SlotRecords in a single `execute_script` call,
+                 or 'lxml' to parse SlotRecords from the page source
+                 (defaults to the `--extract` option)
+        """
+        extract = extract or self.args.extract
+        self.load_prefs()
         slot_route = self.routes.get('SLOT_SELECT')
         # Make sure we are on the slot select page. If not, nav there
         while not slot_route.waypoints[-1].check_current(self.current_url):
@@ -215,41 +404,85 @@ class Browser:
                 handle_redirect(self)
             except Redirect:
                 self.navigate_route(slot_route, retry=True)
+        self.record_snapshot('slots')
+        fingerprint = None
+        if self.args.fingerprint:
+            fingerprint = slot_fingerprint(self.driver)
+            if fingerprint and (fingerprint, self._prefs_version) == \
+                    self._last_fingerprint:
+                self.skip_stats.record(True, self.parse_latency.mean)
+                log.info('Slot page unchanged, skipped parsing ({})'.format(
+                    self.skip_stats
+                ))
+                for slot in self._last_slots:
+                    slot.reset()
+                if self.history:
+                    self.history.record_unchanged(self.site_config.service)
+                return list(self._last_slots)
+        t = perf_counter()
+        slots = self.read_slots(extract)
+        self.parse_latency.add(perf_counter() - t)
+        self.skip_stats.record(False)
+        self._last_fingerprint = None
+        # Live elements go stale on refresh, so only plain records are reused
+        if fingerprint and not any(isinstance(s, SlotElement) for s in slots):
+            self._last_fingerprint = (fingerprint, self._prefs_version)
+            self._last_slots = slots
+        return slots
+
+    def read_slots(self, extract):
         # Wait for one of two possible slot container elements to be present
         wait_for_elements(self.driver, [SlotLocators().CONTAINER,
                                         SlotLocators('multi').CONTAINER])
         if not self.slot_type:
             self.determine_slot_type()
         log.info('Checking for available slots')
-        slots = [
-            self.slot_cls(e) for e in self.driver.find_elements(
+        if extract == 'script':
+            slots = extract_slots(self.driver, self.slot_type)
+        elif extract == 'lxml':
+            slots = PageSnapshot.from_driver(self.driver).slots(self.slot_type)
+        else:
+            elements = self.driver.find_elements(
                 *SlotLocators(self.slot_type).SLOT
             )
-        ]
+            date_index = (self.slot_cls.build_date_index(self.driver)
+                          if elements else None)
+            slots = [self.slot_cls(e, date_index=date_index)
+                     for e in elements]
+        names = [s.full_name for s in slots]
+        self.record_history(slots, names)
         if slots:
             log.info('Found {} slots: \n{}'.format(
-                len(slots), '\n'.join([s.full_name for s in slots])
+                len(slots), '\n'.join(names)
             ))
-        if slots and self.slot_prefs:
+        if slots and self.slot_matcher:
             log.info('Comparing available slots to prefs')
-            preferred_slots = []
-            for cmp in self.slot_prefs:
-                for s in slots:
-                    if cmp.startswith('any'):
-                        if cmp.replace('any', '') in clean_slotname(s):
-                            preferred_slots.append(s)
-                    else:
-                        if clean_slotname(s).startswith(cmp):
-                            preferred_slots.append(s)
+            indices = self.slot_matcher.rank_indices(names)
+            preferred_slots = [slots[i] for i in indices]
             if preferred_slots:
                 log.info('Found {} preferred slots: {}'.format(
                     len(preferred_slots),
-                    '\n'+'\n'.join([p.full_name for p in preferred_slots])
+                    '\n'+'\n'.join([names[i] for i in indices])
                 ))
             return preferred_slots
         else:
             return slots
 
+    def record_snapshot(self, kind):
+        if self.snapshots:
+            self.snapshots.record(self.driver, kind, self.site_config.service)
+
+    def record_history(self, slots, names=None):
+        if not self.history:
+            return
+        if any(isinstance(s, SlotElement) for s in slots):
+            # Live elements: `names` were read already, anything else isn't
+            observations = [observe_name(n, self.slot_type == 'multi')
+                            for n in names]
+        else:
+            observations = [observe(s) for s in slots]
+        self.history.record(self.site_config.service, observations)
+
     def generate_message(self, slots):
         text = []
         for slot in slots:
@@ -266,81 +499,180 @@ class Browser:
                 [self.site_config.service + " delivery slots found!", *text]
             )
 
-    def save_removed_items(self):
+    def save_removed_items(self, extract=None):
         """Writes OOS items that have been removed from cart to a TOML file"""
         removed = []
-        for item in self.driver.find_elements(*self.Locators.OOS_ITEM):
-            if self.Patterns.OOS in item.text:
-                removed.append({
-                    'text': item.text.split(self.Patterns.OOS)[0],
-                    'product_id': item.find_element_by_xpath(
-                            ".//*[starts-with(@name, 'asin')]"
+        if (extract or self.args.extract) == 'lxml':
+            removed = PageSnapshot.from_driver(self.driver).removed_items(
+                self.Patterns.OOS
+            )
+        else:
+            for item in self.driver.find_elements(*self.Locators.OOS_ITEM):
+                if self.Patterns.OOS in item.text:
+                    removed.append({
+                        'text': item.text.split(self.Patterns.OOS)[0],
+                        'product_id': item.find_element(
+                            *self.Locators.OOS_ITEM_ASIN
                         ).get_attribute('value')
-                })
+                    })
         if not removed:
             log.warning("Couldn't detect any removed items to save")
         else:
             dump_toml({'items': removed}, 'removed_items')
 
-    def save_cart(self):
+    @phase('save_cart')
+    def save_cart(self, extract=None):
+        self.limiter.acquire('get')
         jitter(.4)
         self.driver.get(self.site_config.BASE_URL
                         + self.site_config.cart_endpoint)
-        cart = []
-        for element in wait_for_elements(self.driver,
-                                         self.Locators.CART_ITEMS):
+        # An empty cart is saved too, so wait for either
+        wait_for_elements(self.driver, [self.Locators.CART_ITEMS,
+                                        self.Locators.CART_EMPTY])
+        self.record_snapshot('cart')
+        if (extract or self.args.extract) == 'lxml':
+            cart = PageSnapshot.from_driver(self.driver).cart_items()
+        else:
             try:
-                cart.append(CartItem(element).data)
-            except Exception:
-                log.warning('Failed to parse a cart item')
-        if cart:
-            dump_toml(
-                {'cart_item': sorted(cart, key=lambda k: k['product_id'])},
-                self.site_config.service.replace(' ', '') + '_cart'
-            )
+                cart = extract_cart(self.driver)
+            except WebDriverException:
+                log.warning('Cart script failed. Reading items one by one')
+                try:
+                    cart = [CartItem(element).data for element in
+                            self.driver.find_elements(
+                                *self.Locators.CART_ITEMS
+                            )]
+                except WebDriverException:
+                    # A partial cart would log the rest as removed
+                    log.warning('Failed to read the cart. Not saving it')
+                    return
+        changes = CartStore(CART_HISTORY_PATH).update(
+            self.site_config.service, cart
+        )
+        counts = Counter(c['change'] for c in changes)
+        log.info('Cart has {} items ({} added, {} removed, {} changed '
+                 'since the last save)'.format(
+                     len(cart), counts['added'], counts['removed'],
+                     counts['changed']
+                 ))
 
     def main_loop(self):
+        try:
+            self.watch()
+        finally:
+            self.close()
+
+    def close(self):
+        self.notifier.close()
+        if self.history:
+            self.history.close()
+        self.report_stats()
+
+    @phase('refresh')
+    def refresh(self):
+        self.limiter.acquire('refresh')
+        t = perf_counter()
+        self.driver.refresh()
+        self.refresh_latency.add(perf_counter() - t)
+
+    def poll(self):
+        """Refresh the slot page and return available (preferred) slots"""
+        if self.http_poller:
+            try:
+                return self.poll_http()
+            except PollFallback as e:
+                if isinstance(e, PollThrottled):
+                    self.limiter.trip()
+                log.warning('HTTP polling failed: {}. Using browser'.format(e))
+                self.http_poller.invalidate()
+        self.refresh()
+        return self.get_slots()
+
+    def poll_http(self):
+        if not self.http_poller.ready:
+            self.http_poller.sync_from_driver(self.driver)
+        log.info('Checking for available slots over HTTP')
+        self.limiter.acquire('http')
+        all_slots = self.http_poller.get_slots(self.driver)
+        self.load_prefs()
+        slots = all_slots
+        if slots and self.slot_matcher:
+            slots = self.slot_matcher.match(slots)
+        if slots:
+            log.info('Found {} slots over HTTP. Handing off to browser'.format(
+                len(slots)
+            ))
+            self.limiter.acquire('get')
+            self.driver.get(self.site_config.BASE_URL
+                            + self.http_poller.slot_path)
+            # Recorded by the browser's read instead
+            return self.get_slots()
+        self.record_history(all_slots)
+        return slots
+
+    def report_stats(self):
+        log.info('Refresh latency: {}'.format(self.refresh_latency))
+        log.info('Slot parsing latency: {}'.format(self.parse_latency))
+        if self.http_poller:
+            log.info('HTTP poll latency: {}'.format(self.http_poller.latency))
+        if self.args.fingerprint:
+            log.info('Unchanged slot pages: {}'.format(self.skip_stats))
+        rss = chrome_rss(self.driver)
+        if rss is not None:
+            log.info('Chrome memory (RSS): {:.0f}MB'.format(rss / 2**20))
+        log.debug('Config cache stats: {}'.format(conf_cache.stats()))
+        log.debug('Login cache: {}'.format(self.login))
+        log.info('Rate limiter: {}'.format(self.limiter))
+        if instrument.recorder:
+            instrument.recorder.dump()
+
+    def prepare(self):
+        """Wait for login, save the cart if asked to and go to slot select"""
         wait_for_auth(self)
+        self.startup.mark('login')
         if self.args.save_cart:
             try:
                 self.save_cart()
             except Exception:
                 log.error('Failed to save cart items')
+            self.startup.mark('save_cart')
         self.navigate_route('SLOT_SELECT', retry=True)
+        self.startup.mark('navigate')
+
+    def first_poll(self):
         slots = self.get_slots()
+        if self.startup.finish():
+            log.info('Time to first poll: {}'.format(self.startup))
+        return slots
+
+    def found_slots(self, slots, detected):
+        """
+        Send slot notifications and check out if asked to. Returns False if
+        checkout failed and watching should go on
+        """
+        self.notifier.alert('Delivery slots found')
+        self.notifier.send_message(self.generate_message(slots))
+        if not self.args.checkout:
+            return True
+        log.info('Attempting to select slot and checkout')
+        if CheckoutEngine(self, slots, detected).run():
+            self.notifier.alert('Checkout complete', 'Hero')
+            return True
+        return False
+
+    def watch(self):
+        self.prepare()
+        slots = self.first_poll()
         if slots:
-            annoy()
-            alert('Delivery slots available. What do you need me for?',
-                  'Sosumi')
-        else:
-            self.executor = ThreadPoolExecutor()
+            self.notifier.annoy()
+            self.notifier.alert(
+                'Delivery slots available. What do you need me for?', 'Sosumi'
+            )
         while not slots:
             log.info('No slots found :( waiting...')
-            jitter(INTERVAL)
-            self.driver.refresh()
-            slots = self.get_slots()
-            if slots:
-                alert('Delivery slots found')
-                message_body = self.generate_message(slots)
-                self.executor.submit(send_sms, message_body)
-                self.executor.submit(send_telegram, message_body)
-                if not self.args.checkout:
-                    break
-                checked_out = False
-                log.info('Attempting to select slot and checkout')
-                while not checked_out:
-                    try:
-                        log.info('Selecting slot: ' + slots[0].full_name)
-                        slots[0].select()
-                        self.navigate_route('CHECKOUT')
-                        checked_out = True
-                        alert('Checkout complete', 'Hero')
-                    except RouteRedirect:
-                        log.warning(
-                            'Checkout failed: Redirected to slot select'
-                        )
-                        slots = self.get_slots()
-                        if not slots:
-                            break
-        if self.executor:
-            self.executor.shutdown()
+            sleep(self.scheduler.next_interval())
+            slots = self.poll()
+            detected = perf_counter()
+            self.scheduler.record_poll(bool(slots))
+            if slots and not self.found_slots(slots, detected):
+                slots = []
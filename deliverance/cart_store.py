@@ -0,0 +1,101 @@
+import json
+import logging
+from datetime import datetime
+
+log = logging.getLogger(__name__)
+
+TRACKED_FIELDS = ['quantity', 'price']
+
+
+def item_key(item):
+    """An item's product_id (ASIN), or its name if the row has none"""
+    return item.get('product_id') or item.get('name')
+
+
+def diff_cart(previous, current):
+    """
+    Compare two `{item_key: item}` snapshots. Returns change records for
+    added and removed items, and for items whose quantity or price changed
+    """
+    changes = []
+    for key, item in current.items():
+        old = previous.get(key)
+        if old is None:
+            changes.append(dict(item, change='added'))
+            continue
+        changed = {k: item.get(k) for k in TRACKED_FIELDS
+                   if item.get(k) != old.get(k)}
+        if changed:
+            changes.append(dict(
+                changed, change='changed', product_id=old.get('product_id'),
+                name=old.get('name'), previous={k: old.get(k) for k in changed}
+            ))
+    for key, item in previous.items():
+        if key not in current:
+            changes.append({'change': 'removed',
+                            'product_id': item.get('product_id'),
+                            'name': item.get('name')})
+    return changes
+
+
+class CartStore:
+    """
+    Append-only JSON lines log of cart changes, keyed by product_id
+
+    Each save appends only the differences from the previous snapshot of
+    the same service. The latest snapshots are rebuilt from the log when
+    it is opened
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.snapshots = {}
+        try:
+            with open(path, encoding='utf-8') as f:
+                for line in f:
+                    if line.strip():
+                        self.apply(json.loads(line))
+        except FileNotFoundError:
+            pass
+
+    def apply(self, record):
+        cart = self.snapshots.setdefault(record['service'], {})
+        key = item_key(record)
+        if record['change'] == 'removed':
+            cart.pop(key, None)
+        elif record['change'] == 'added':
+            cart[key] = {k: v for k, v in record.items()
+                         if k not in ('change', 'service', 'time')}
+        else:
+            cart.setdefault(key, {'product_id': record.get('product_id'),
+                                  'name': record.get('name')}).update(
+                {k: record[k] for k in TRACKED_FIELDS if k in record}
+            )
+
+    def current(self, service):
+        """The latest snapshot as a list of items"""
+        return sorted(self.snapshots.get(service, {}).values(), key=item_key)
+
+    def update(self, service, items):
+        """
+        Append the changes since the previous snapshot and return them.
+        `items` may be empty (an empty cart). Missing fields are stored as
+        null, but rows with neither a product_id nor a name can't be told
+        apart and are left out
+        """
+        current = {}
+        for item in items:
+            if item_key(item):
+                current[item_key(item)] = item
+            else:
+                log.warning('Skipping a cart item with no product id or '
+                            'name: {}'.format(item))
+        changes = diff_cart(self.snapshots.get(service, {}), current)
+        if changes:
+            now = datetime.utcnow().isoformat(timespec='seconds') + 'Z'
+            with open(self.path, 'a', encoding='utf-8') as f:
+                for change in changes:
+                    record = dict(change, service=service, time=now)
+                    f.write(json.dumps(record, sort_keys=True) + '\n')
+                    self.apply(record)
+        return changes
@@ -0,0 +1,96 @@
+import logging
+from collections import deque
+from time import perf_counter
+from selenium.common.exceptions import WebDriverException
+
+from .exceptions import RouteRedirect, SlotDateElementAmbiguous
+
+log = logging.getLogger(__name__)
+
+
+def stage_name(waypoint):
+    """Short name of a checkout waypoint, e.g. 'payselect'"""
+    return waypoint.dest[0].split('/handlers')[0].split('/')[-1]
+
+
+class CheckoutEngine:
+    """
+    Works through a ranked queue of slot candidates until one checks out
+
+    Candidates keep the rank of the first scan. On failure, the remaining
+    ones are re-resolved with a single script call and the next one is
+    tried straight away, without a full rescan. Time since the slots were
+    detected is logged as each checkout stage is reached
+    """
+
+    def __init__(self, browser, slots, detected=None):
+        self.browser = browser
+        self.detected = detected or perf_counter()
+        self.candidates = deque((slot.full_name, slot) for slot in slots)
+        self.tried = set()
+        self.timeline = []
+
+    def mark(self, stage):
+        elapsed = perf_counter() - self.detected
+        self.timeline.append((stage, elapsed))
+        log.info('Checkout stage {}: +{:.2f}s since detection'.format(
+            stage, elapsed
+        ))
+
+    def refresh_candidates(self):
+        """
+        Re-resolve the remaining candidates (keeping their rank) after a
+        failed attempt, dropping any that are no longer available
+        """
+        if not self.candidates:
+            return
+        available = {
+            slot.full_name: slot
+            for slot in self.browser.get_slots(extract='script')
+        }
+        self.candidates = deque(
+            (name, available[name]) for name, _ in self.candidates
+            if name in available
+        )
+        log.info('{} checkout candidates remaining'.format(
+            len(self.candidates)
+        ))
+
+    def attempt(self, name, slot):
+        log.info('Selecting slot: ' + name)
+        slot.select()
+        self.mark('slot_selected')
+        self.browser.navigate_route(
+            'CHECKOUT', on_waypoint=lambda w: self.mark(stage_name(w))
+        )
+
+    def run(self):
+        """Return True once a candidate has been checked out"""
+        while self.candidates:
+            name, slot = self.candidates.popleft()
+            self.tried.add(name)
+            try:
+                self.attempt(name, slot)
+                self.report()
+                return True
+            except RouteRedirect:
+                log.warning('Checkout with {} failed: Redirected to slot '
+                            'select'.format(name))
+                self.mark('redirected')
+                self.refresh_candidates()
+            except (SlotDateElementAmbiguous, WebDriverException) as e:
+                log.warning('Checkout with {} failed: {}'.format(
+                    name, e.__class__.__name__
+                ))
+                self.mark('failed')
+                self.refresh_candidates()
+        log.warning('No more checkout candidates ({} tried)'.format(
+            len(self.tried)
+        ))
+        self.report()
+        return False
+
+    def report(self):
+        log.info('Checkout timeline: {}'.format(', '.join(
+            '{} +{:.2f}s'.format(stage, t) for stage, t in self.timeline
+        )))
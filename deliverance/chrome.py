@@ -0,0 +1,127 @@
+import logging
+import subprocess
+from selenium import webdriver
+from selenium.webdriver.chrome.options import Options
+
+import config
+
+log = logging.getLogger(__name__)
+
+# Resources the slot select page doesn't need. Stylesheets and scripts are
+# kept since element visibility and click handlers depend on them
+LEAN_BLOCKED_URLS = [
+    '*.jpg', '*.jpeg', '*.png', '*.gif', '*.webp', '*.svg', '*.ico',
+    '*.woff', '*.woff2', '*.ttf', '*.otf',
+    '*.mp4', '*.webm', '*.m3u8', '*.mp3',
+    '*doubleclick.net*', '*amazon-adsystem.com*', '*google-analytics.com*',
+    '*googletagmanager.com*', '*facebook.net*', '*fls-na.amazon.com*',
+    '*unagi.amazon.com*'
+]
+
+
+def chrome_options(args):
+    opts = Options()
+    if args.attach:
+        # Launch options don't apply to a browser that is already running
+        opts.debugger_address = args.attach
+        return opts
+    opts.add_argument("user-data-dir=" + config.USER_DATA_DIR)
+    if args.lean:
+        opts.headless = True
+        opts.set_capability('pageLoadStrategy', 'eager')
+        opts.add_argument('--blink-settings=imagesEnabled=false')
+        opts.add_argument('--mute-audio')
+        opts.add_experimental_option('prefs', {
+            'profile.managed_default_content_settings.images': 2,
+            'profile.managed_default_content_settings.media_stream': 2,
+            'profile.managed_default_content_settings.plugins': 2
+        })
+    return opts
+
+
+def build_driver(args):
+    """
+    Launch Chrome (or attach to a running one, if `args.attach` is set),
+    applying lean mode options if requested
+    """
+    if args.attach:
+        log.info('Attaching to Chrome at {}'.format(args.attach))
+    else:
+        log.info('Invoking Selenium Chrome webdriver')
+    driver = webdriver.Chrome(options=chrome_options(args))
+    if args.lean:
+        log.info('Lean mode: blocking {} resource patterns'.format(
+            len(LEAN_BLOCKED_URLS)
+        ))
+        driver.execute_cdp_cmd('Network.enable', {})
+        driver.execute_cdp_cmd('Network.setBlockedURLs',
+                               {'urls': LEAN_BLOCKED_URLS})
+    return driver
+
+
+def chrome_rss(driver):
+    """
+    Total resident memory (bytes) of chromedriver and its child processes
+
+    Returns None if the process tree can't be inspected on this platform
+    """
+    try:
+        root = driver.service.process.pid
+    except AttributeError:
+        return None
+    return process_tree_rss(root)
+
+
+def _ps_tree():
+    """Map each pid to its children, and to its RSS (bytes), using `ps`"""
+    output = subprocess.check_output(['ps', '-A', '-o', 'pid=,ppid=,rss='],
+                                     universal_newlines=True)
+    children = {}
+    rss = {}
+    for line in output.splitlines():
+        pid, ppid, kb = (int(x) for x in line.split())
+        children.setdefault(ppid, []).append(pid)
+        rss[pid] = kb * 1024
+    return children, rss
+
+
+def _walk(root, children):
+    stack = [root]
+    while stack:
+        pid = stack.pop()
+        yield pid
+        stack.extend(children.get(pid, []))
+
+
+def process_tree_rss(root):
+    """Total resident memory (bytes) of a process and its descendants"""
+    try:
+        import psutil
+        proc = psutil.Process(root)
+        return sum(p.memory_info().rss
+                   for p in [proc] + proc.children(recursive=True))
+    except ImportError:
+        pass
+    except Exception:
+        return None
+    try:
+        children, rss = _ps_tree()
+    except Exception:
+        return None
+    return sum(rss.get(pid, 0) for pid in _walk(root, children))
+
+
+def descendants(root):
+    """Pids of a process's descendants (e.g. chromedriver and Chrome)"""
+    try:
+        import psutil
+        return [p.pid for p in psutil.Process(root).children(recursive=True)]
+    except ImportError:
+        pass
+    except Exception:
+        return []
+    try:
+        children, _ = _ps_tree()
+    except Exception:
+        return []
+    return list(_walk(root, children))[1:]
@@ -0,0 +1,343 @@
+import json
+import logging
+import os
+import queue
+import socket
+import socketserver
+import threading
+from datetime import datetime
+from time import monotonic, perf_counter, time
+
+import toml
+from selenium.common.exceptions import WebDriverException
+
+from config import DAEMON_SOCKET
+from .checkout import CheckoutEngine
+from .chrome import chrome_rss
+from . import instrument
+
+log = logging.getLogger(__name__)
+
+# Seconds a client waits for a command queued behind a poll or checkout
+COMMAND_TIMEOUT = 900
+# Consecutive failed polls before watching stops
+MAX_ERRORS = 5
+
+# Answered straight from the socket thread, without waiting for the browser
+READ_ONLY_COMMANDS = ['status', 'metrics']
+
+
+class ControlHandler(socketserver.StreamRequestHandler):
+    """One JSON request line in, one JSON response line out"""
+
+    def handle(self):
+        try:
+            request = json.loads(self.rfile.readline().decode('utf-8'))
+            command = request.pop('command')
+            if not isinstance(command, str):
+                raise ValueError(command)
+        except (ValueError, KeyError, AttributeError):
+            response = {'ok': False, 'error': 'Malformed request'}
+        else:
+            response = self.server.controller.submit(command, request)
+        self.wfile.write(json.dumps(response, default=str).encode('utf-8')
+                         + b'\n')
+
+
+class ControlServer(socketserver.ThreadingMixIn,
+                    socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+class Daemon:
+    """
+    Keeps a Browser parked on the slot select page between watch sessions
+
+    Commands arrive over a Unix socket (see `send_command`) and are run on
+    the main thread, between polls, since the driver isn't thread safe.
+    `status` and `metrics` only read counters and are answered right away.
+    The browser, its login and route state, and the driver's session are
+    reused by every watch session, so starting one costs a refresh rather
+    than a browser launch and a route navigation
+    """
+
+    def __init__(self, browser, path=DAEMON_SOCKET):
+        self.browser = browser
+        self.path = path
+        self.commands = queue.Queue()
+        self.server = None
+        self.running = True
+        self.watching = False
+        self.prepared = False
+        self.next_poll = None
+        self.polls = 0
+        self.found = 0
+        self.errors = 0
+        self.last_poll = None
+        self.last_slots = []
+        self.started = time()
+
+    def listen(self):
+        if os.path.exists(self.path):
+            try:
+                send_command(self.path, 'status', timeout=1)
+            except OSError:
+                # Left over from a daemon that didn't shut down cleanly
+                os.unlink(self.path)
+            else:
+                raise RuntimeError(
+                    "A daemon is already listening on '{}'".format(self.path)
+                )
+        # The socket can trigger a checkout, so only its owner may connect
+        umask = os.umask(0o177)
+        try:
+            self.server = ControlServer(self.path, ControlHandler)
+        finally:
+            os.umask(umask)
+        self.server.controller = self
+        threading.Thread(target=self.server.serve_forever,
+                         daemon=True).start()
+        log.info("Listening for commands on '{}'".format(self.path))
+
+    def submit(self, command, params):
+        """Run a command and return its response. Called by the handler"""
+        if command in READ_ONLY_COMMANDS:
+            return self.run_command(command, params)
+        reply = queue.Queue(maxsize=1)
+        self.commands.put((command, params, reply))
+        try:
+            return reply.get(timeout=COMMAND_TIMEOUT)
+        except queue.Empty:
+            return {'ok': False, 'error': 'Timed out waiting for the browser'}
+
+    def run_command(self, command, params):
+        try:
+            handler = getattr(self, 'do_' + command, None)
+            if handler is None:
+                return {'ok': False,
+                        'error': "Unknown command '{}'".format(command)}
+            log.info('Command: {} {}'.format(command, params or ''))
+            return {'ok': True, 'result': handler(**params)}
+        except Exception as e:
+            log.error("Command '{}' failed".format(command), exc_info=True)
+            return {'ok': False,
+                    'error': '{}: {}'.format(e.__class__.__name__, e)}
+
+    def serve(self):
+        self.listen()
+        try:
+            try:
+                # Park on the slot page now, so the first command is quick
+                self.ensure_prepared()
+            except (WebDriverException, RuntimeError):
+                log.error('Failed to reach the slot select page. Will retry '
+                          'on the next poll or checkout', exc_info=True)
+            while self.running:
+                timeout = None
+                if self.watching:
+                    timeout = max(0, self.next_poll - monotonic())
+                try:
+                    command, params, reply = self.commands.get(
+                        timeout=timeout
+                    )
+                except queue.Empty:
+                    self.poll()
+                    continue
+                reply.put(self.run_command(command, params))
+        except KeyboardInterrupt:
+            log.warning('Interrupted')
+        finally:
+            self.server.shutdown()
+            self.server.server_close()
+            try:
+                os.unlink(self.path)
+            except OSError:
+                pass
+
+    def ensure_prepared(self):
+        if not self.prepared:
+            self.browser.prepare()
+            self.prepared = True
+
+    def schedule(self):
+        self.next_poll = monotonic() + self.browser.scheduler.next_interval()
+
+    def poll(self):
+        browser = self.browser
+        try:
+            self.ensure_prepared()
+            slots = browser.poll()
+        except (WebDriverException, RuntimeError):
+            self.errors += 1
+            log.error('Poll failed ({}/{})'.format(self.errors, MAX_ERRORS),
+                      exc_info=True)
+            if self.errors >= MAX_ERRORS:
+                browser.notifier.alert('Watching stopped after errors',
+                                       'Basso')
+                self.watching = False
+            self.schedule()
+            return
+        detected = perf_counter()
+        self.errors = 0
+        self.polls += 1
+        self.last_poll = time()
+        self.last_slots = [slot.full_name for slot in slots]
+        if browser.startup.finish():
+            log.info('Time to first poll: {}'.format(browser.startup))
+        browser.scheduler.record_poll(bool(slots))
+        if slots:
+            self.found += 1
+            if browser.found_slots(slots, detected):
+                log.info('Watch complete. Waiting for commands')
+                self.watching = False
+                return
+        self.schedule()
+
+    def do_start(self, checkout=None):
+        """Start watching. checkout: Override the --checkout option"""
+        if checkout is not None:
+            self.browser.args.checkout = bool(checkout)
+        if not self.watching:
+            self.watching = True
+            self.errors = 0
+            self.next_poll = monotonic()
+        return self.do_status()
+
+    def do_stop(self):
+        self.watching = False
+        return self.do_status()
+
+    def do_service(self, name):
+        """
+        Switch delivery service. Watching (if on) continues on the new one
+        """
+        if name != self.browser.site_config.service:
+            self.browser.set_service(name)
+            self.prepared = False
+            self.last_slots = []
+            if self.watching:
+                self.next_poll = monotonic()
+        return self.do_status()
+
+    def do_prefs(self, prefs=None):
+        """
+        Replace the slot preferences (a dict like conf.toml's
+        `slot_preference` section), or go back to the config file's if None
+        """
+        self.browser.set_prefs(prefs)
+        return self.browser.slot_prefs
+
+    def do_checkout(self):
+        """Check out with the best available slot now"""
+        self.ensure_prepared()
+        # The page may be from the last poll, minutes ago
+        slots = self.browser.poll()
+        if not slots:
+            return {'checked_out': False, 'reason': 'No slots available'}
+        checked_out = CheckoutEngine(self.browser, slots).run()
+        if checked_out:
+            self.browser.notifier.alert('Checkout complete', 'Hero')
+            self.watching = False
+        return {'checked_out': checked_out}
+
+    def do_quit(self):
+        self.running = False
+        self.watching = False
+        return 'Shutting down'
+
+    def do_status(self):
+        browser = self.browser
+        return {
+            'watching': self.watching,
+            'service': browser.site_config.service,
+            'checkout': browser.args.checkout,
+            'prefs': browser.slot_prefs,
+            'prefs_source': ('command' if browser.prefs_override is not None
+                             else 'conf'),
+            'polls': self.polls,
+            'found': self.found,
+            'errors': self.errors,
+            'last_poll': (datetime.fromtimestamp(self.last_poll).isoformat(
+                timespec='seconds') if self.last_poll else None),
+            'next_poll_in': (round(max(0, self.next_poll - monotonic()), 1)
+                             if self.watching else None),
+            'last_slots': self.last_slots,
+            'queued_commands': self.commands.qsize(),
+            'uptime': round(time() - self.started)
+        }
+
+    def do_metrics(self):
+        browser = self.browser
+        metrics = {
+            'startup': str(browser.startup),
+            'refresh_latency': browser.refresh_latency.summary(),
+            'parse_latency': browser.parse_latency.summary(),
+            'unchanged_slot_pages': str(browser.skip_stats),
+            'rate_limiter': str(browser.limiter),
+            'login_cache': str(browser.login),
+            'notifications': browser.notifier.metrics()
+        }
+        if browser.http_poller:
+            metrics['http_poll_latency'] = \
+                browser.http_poller.latency.summary()
+        rss = chrome_rss(browser.driver)
+        if rss is not None:
+            metrics['chrome_rss_mb'] = round(rss / 2**20)
+        if instrument.recorder:
+            metrics['webdriver'] = instrument.recorder.summary()
+        return metrics
+
+
+def send_command(path, command, timeout=None, **params):
+    """Send a command to a daemon and return its response"""
+    request = dict(params, command=command)
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(path)
+        sock.sendall(json.dumps(request).encode('utf-8') + b'\n')
+        with sock.makefile('rb') as f:
+            line = f.readline()
+    if not line:
+        raise ConnectionError('No response from the daemon')
+    return json.loads(line.decode('utf-8'))
+
+
+def command_params(command, values):
+    """
+    Build a command's parameters from command line values, e.g.
+     - service 'Amazon Fresh'
+     - prefs prefs.toml (a file with a `slot_preference` section)
+     - prefs '{"Any": ["Any"]}'
+     - prefs (no value: back to conf.toml)
+    """
+    if command == 'service':
+        if len(values) != 1:
+            raise ValueError('Usage: service NAME')
+        return {'name': values[0]}
+    if command == 'prefs':
+        if not values:
+            return {'prefs': None}
+        value = values[0]
+        if os.path.exists(value):
+            prefs = toml.load(value)
+            return {'prefs': prefs.get('slot_preference', prefs)}
+        return {'prefs': json.loads(value)}
+    if values:
+        raise ValueError("'{}' takes no arguments".format(command))
+    return {}
+
+
+def run_daemon(args, started=None):
+    """Start Chrome and serve commands until told to quit"""
+    from . import Browser
+    from .supervisor import start_driver
+
+    driver, startup = start_driver(args, started)
+    browser = Browser(driver, args, startup)
+    try:
+        Daemon(browser, args.socket).serve()
+    finally:
+        browser.close()
+        log.info('Detaching from Chrome' if args.attach
+                 else 'Closing webdriver')
+        driver.quit()
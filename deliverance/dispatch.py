@@ -0,0 +1,150 @@
+import logging
+import queue
+import threading
+from collections import deque, namedtuple
+from time import perf_counter
+
+from .metrics import LatencyStats
+from .notify import BACKENDS
+from .utils import is_configured
+
+log = logging.getLogger(__name__)
+
+Receipt = namedtuple(
+    'Receipt', ['backend', 'message', 'ok', 'latency', 'send_time', 'error']
+)
+
+_STOP = object()
+
+
+class BackendQueue:
+    """A bounded queue and worker threads for one notification backend"""
+
+    def __init__(self, backend, queue_size, on_receipt, concurrency=None):
+        self.backend = backend
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.on_receipt = on_receipt
+        self.latency = LatencyStats()
+        self.sent = 0
+        self.failed = 0
+        self.dropped = 0
+        self._lock = threading.Lock()
+        self.threads = [
+            threading.Thread(target=self.work, daemon=True,
+                             name='notify-{}-{}'.format(backend.name, i))
+            for i in range(concurrency or backend.concurrency)
+        ]
+        for thread in self.threads:
+            thread.start()
+
+    def put(self, message, kwargs):
+        try:
+            self.queue.put_nowait((message, kwargs, perf_counter()))
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+            log.warning("Notification queue for '{}' is full. "
+                        "Dropping message".format(self.backend.name))
+
+    def work(self):
+        while True:
+            item = self.queue.get()
+            if item is _STOP:
+                return
+            message, kwargs, queued = item
+            t = perf_counter()
+            error = None
+            try:
+                ok = self.backend.send(message, **kwargs) is not None
+            except Exception as e:
+                ok, error = False, e
+                log.error("Notification backend '{}' failed".format(
+                    self.backend.name
+                ), exc_info=True)
+            done = perf_counter()
+            self.latency.add(done - queued)
+            with self._lock:
+                if ok:
+                    self.sent += 1
+                else:
+                    self.failed += 1
+            self.on_receipt(Receipt(self.backend.name, message, ok,
+                                    done - queued, done - t, error))
+
+    def stop(self, timeout):
+        for _ in self.threads:
+            try:
+                self.queue.put(_STOP, timeout=timeout)
+            except queue.Full:
+                pass
+
+    def metrics(self):
+        return dict(sent=self.sent, failed=self.failed, dropped=self.dropped,
+                    queued=self.queue.qsize(), **self.latency.summary())
+
+
+class Dispatcher:
+    """
+    Delivers notifications in the background
+
+    Each backend has its own bounded queue and worker threads, so a slow or
+    failing backend never delays the others or the caller. Messages for a
+    backend with one worker are delivered in order. When a queue is full,
+    new messages for that backend are dropped
+
+    concurrency: optional dict of worker counts by backend name, overriding
+                 the registered defaults
+    """
+
+    def __init__(self, backends=None, queue_size=32, receipts=100,
+                 concurrency=None):
+        concurrency = concurrency or {}
+        self.receipts = deque(maxlen=receipts)
+        self.queues = {
+            name: BackendQueue(BACKENDS[name], queue_size, self.on_receipt,
+                               concurrency.get(name))
+            for name in backends or BACKENDS
+        }
+
+    def on_receipt(self, receipt):
+        self.receipts.append(receipt)
+        log.debug('Notification receipt: {}'.format(receipt))
+
+    def enabled(self, name):
+        backend = self.queues[name].backend
+        return not backend.conf_key or is_configured(backend.conf_key,
+                                                     backend.required)
+
+    def notify(self, message, backends=None, **kwargs):
+        """Queue a message for delivery without blocking"""
+        for name in backends or self.queues:
+            if name not in self.queues or not self.enabled(name):
+                log.debug("Notification backend '{}' is not enabled".format(
+                    name
+                ))
+                continue
+            self.queues[name].put(message, kwargs)
+
+    def send_message(self, message):
+        """Queue a text message for every remote backend"""
+        self.notify(message, [name for name, q in self.queues.items()
+                              if q.backend.remote])
+
+    def alert(self, message, sound='Blow'):
+        self.notify(message, ['audio'], sound=sound)
+
+    def annoy(self):
+        self.notify('', ['audio'], annoy_user=True)
+
+    def metrics(self):
+        return {name: q.metrics() for name, q in self.queues.items()}
+
+    def close(self, timeout=10):
+        """Deliver queued messages (waiting up to `timeout`s) and stop"""
+        deadline = perf_counter() + timeout
+        for q in self.queues.values():
+            q.stop(timeout)
+        for q in self.queues.values():
+            for thread in q.threads:
+                thread.join(max(0, deadline - perf_counter()))
+        log.info('Notification metrics: {}'.format(self.metrics()))
@@ -2,10 +2,26 @@ import logging
 import re
 
 from .exceptions import SlotDateElementAmbiguous
-from .utils import click_when_enabled, get_element_text
+from .utils import click_when_enabled, get_element_text, xpath_literal
 
 log = logging.getLogger(__name__)
 
+# Reads one attribute from each of a list of elements in a single round trip
+# arguments[0]: list of elements, arguments[1]: attribute name
+DATE_INDEX_JS = """
+var attr = arguments[1];
+return arguments[0].map(function(e) {
+  return e.getAttribute(attr);
+});
+"""
+
+
+def child_xpath(xpath_or_pattern):
+    """Expand a bare class name pattern into a relative descendant XPATH"""
+    if not re.search(r'/|\[', xpath_or_pattern):
+        return ".//*[contains(@class, '{}')]".format(xpath_or_pattern)
+    return xpath_or_pattern
+
 
 class WebElement:
     def __init__(self, element):
@@ -36,10 +52,7 @@ class WebElement:
         return elems[0]
 
     def find_child(self, xpath_or_pattern):
-        if not re.search(r'/|\[', xpath_or_pattern):
-            xpath = ".//*[contains(@class, '{}')]".format(xpath_or_pattern)
-        else:
-            xpath = xpath_or_pattern
+        xpath = child_xpath(xpath_or_pattern)
         child = self._element.find_elements_by_xpath(xpath)
         if len(child) > 1:
             log.debug("Multiple children found with xpath: '{}'".format(xpath))
@@ -55,32 +68,81 @@ class DateElement(WebElement):
 
 
 class SlotElement(WebElement):
+    SLOT_TYPE = 'single'
     STR_XPATH = ['slot-time-window-text', 'slot-price-text']
     STR_SEP = ' - '
     DATE_CLS = DateElement
+    DATE_ANCESTOR = "div[contains(@class, 'ufss-slotselect ')]"
+    DATE_ID_PATTERN = None
+    DATE_XPATH = "//button[@name='{}']"
+    DATE_INDEX_XPATH = "//button[@name]"
+    DATE_INDEX_ATTR = 'name'
 
-    def __init__(self, slot_element, date_element=None):
+    def __init__(self, slot_element, date_element=None, date_index=None):
         self._element = slot_element
         self.driver = slot_element.parent
+        self._full_name = None
         if date_element is None:
             log.debug('Attempting to find date element for slot: {}'.format(
                 slot_element
             ))
-            date_element = self.find_date_element()
+            date_element = self.find_date_element(date_index)
         if not isinstance(date_element, self.DATE_CLS):
             date_element = self.DATE_CLS(date_element)
         self._date_element = date_element
 
     @property
     def full_name(self):
-        return '::'.join([self._date_element.name, self.name])
+        # Read once: it is used for preference matching, logging and checkout
+        if self._full_name is None:
+            self._full_name = '::'.join([self._date_element.name, self.name])
+        return self._full_name
 
-    def find_date_element(self):
-        id = (self.find_ancestor("div[contains(@class, 'ufss-slotselect ')]")
-              .get_attribute('id'))
-        elems = self.driver.find_elements_by_xpath(
-            "//button[@name='{}']".format(id)
-        )
+    @property
+    def window(self):
+        return get_element_text(self.find_child(self.STR_XPATH[0]))
+
+    @property
+    def price(self):
+        if len(self.STR_XPATH) > 1:
+            return get_element_text(self.find_child(self.STR_XPATH[1]))
+
+    @property
+    def delivery_type(self):
+        return None
+
+    @classmethod
+    def date_key(cls, value):
+        """Extract the date id from a slot or date button attribute value"""
+        if value and cls.DATE_ID_PATTERN:
+            match = re.search(cls.DATE_ID_PATTERN, value)
+            return match.group() if match else None
+        return value
+
+    @classmethod
+    def build_date_index(cls, driver):
+        """Map date ids to date button elements in one pass"""
+        buttons = driver.find_elements_by_xpath(cls.DATE_INDEX_XPATH)
+        values = driver.execute_script(
+            DATE_INDEX_JS, buttons, cls.DATE_INDEX_ATTR
+        ) if buttons else []
+        date_index = {}
+        for button, value in zip(buttons, values):
+            date_index.setdefault(cls.date_key(value), []).append(button)
+        return date_index
+
+    @property
+    def date_id(self):
+        return self.find_ancestor(self.DATE_ANCESTOR).get_attribute('id')
+
+    def find_date_element(self, date_index=None):
+        id = self.date_id
+        if date_index is not None:
+            elems = date_index.get(id, [])
+        else:
+            elems = self.driver.find_elements_by_xpath(
+                self.DATE_XPATH.format(id)
+            )
         if len(elems) != 1:
             raise SlotDateElementAmbiguous(
                 'Expected 1 date element but found {}'.format(len(elems))
@@ -102,34 +164,30 @@ class DateElementMulti(DateElement):
 
 
 class SlotElementMulti(SlotElement):
+    SLOT_TYPE = 'multi'
     STR_XPATH = ['slotRadioLabel']
     DATE_CLS = DateElementMulti
+    DATE_ANCESTOR = None
+    DATE_ID_PATTERN = r'\d{4}-\d{2}-\d{2}'
+    DELIVERY_TYPE_PATTERN = r'(UN)?ATTENDED'
+    DATE_XPATH = "//button[contains(@id, 'date-button-{}')]"
+    DATE_INDEX_XPATH = "//button[contains(@id, 'date-button-')]"
+    DATE_INDEX_ATTR = 'id'
 
     def __str__(self):
-        return self.STR_SEP.join(
-            [self.delivery_type,
-             get_element_text(self.find_child(self.STR_XPATH[0]))]
-        )
+        return self.STR_SEP.join([self.delivery_type, self.window])
 
     @property
     def delivery_type(self):
-        return re.search(r'(UN)?ATTENDED', self.id).group()
+        return re.search(self.DELIVERY_TYPE_PATTERN, self.id).group()
 
     @property
     def name(self):
         return str(self)
 
-    def find_date_element(self):
-        id = re.search(r'\d{4}-\d{2}-\d{2}', self.id).group()
-        elems = self.driver.find_elements_by_xpath(
-            "//button[contains(@id, 'date-button-{}')]".format(id)
-        )
-        if len(elems) != 1:
-            raise SlotDateElementAmbiguous(
-                'Expected 1 date element but found {}'.format(len(elems))
-            )
-        else:
-            return elems[0]
+    @property
+    def date_id(self):
+        return re.search(self.DATE_ID_PATTERN, self.id).group()
 
     def select(self, **kwargs):
         click_when_enabled(
@@ -148,26 +206,52 @@ class SlotElementMulti(SlotElement):
 class CartItem(WebElement):
     STR_XPATH = ['sc-product-title', 'qs-widget-container']
     STR_SEP = ' - Qty: '
+    PRICE_XPATH = 'sc-price '
+    LINK_XPATH = 'sc-product-link'
 
     @property
     def product_id(self):
         return self._element.get_attribute('data-asin')
 
+    def find_children(self, xpath_or_pattern):
+        return self._element.find_elements_by_xpath(
+            child_xpath(xpath_or_pattern)
+        )
+
+    def child_text(self, xpath_or_pattern):
+        children = self.find_children(xpath_or_pattern)
+        return get_element_text(children[0]) if children else None
+
     @property
     def data(self):
+        """The row's fields. Any the row doesn't show are None"""
+        links = self.find_children(self.LINK_XPATH)
         return {
-            'name': self.name,
-            'quantity': get_element_text(self.find_child(self.STR_XPATH[1])),
-            'price': get_element_text(self.find_child('sc-price ')),
+            'name': self.child_text(self.STR_XPATH[0]),
+            'quantity': self.child_text(self.STR_XPATH[1]),
+            'price': self.child_text(self.PRICE_XPATH),
             'product_id': self.product_id,
-            'link': self.find_child('sc-product-link').get_attribute('href')
+            'link': links[0].get_attribute('href') if links else None
         }
 
 
 class PaymentRow(WebElement):
+    CARD_XPATH = 'card-info'
+
+    @classmethod
+    def radio_xpath(cls, row_xpath, card_number):
+        """XPATH of the radio button of the row for `card_number`"""
+        # card_number comes from conf.toml, so quote it as a literal
+        return ("{}[{}[contains(concat(normalize-space(.), '|'), {})]]"
+                "//input[@type='radio']".format(
+                    row_xpath, child_xpath(cls.CARD_XPATH),
+                    xpath_literal(' {}|'.format(card_number))
+                ))
+
     @property
     def card_number(self):
-        return get_element_text(self.find_child('card-info')).split(' ')[-1]
+        text = get_element_text(self.find_child(self.CARD_XPATH))
+        return text.split(' ')[-1]
 
     def select(self, **kwargs):
         click_when_enabled(
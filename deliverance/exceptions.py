@@ -28,3 +28,11 @@ class RouteRedirect(Redirect):
 
 class UnhandledRedirect(Redirect):
     """Raise when all redirect handlers have failed"""
+
+
+class PollFallback(Redirect):
+    """Raise when polling over HTTP fails and the browser must take over"""
+
+
+class PollThrottled(PollFallback):
+    """Raise when polling over HTTP is redirected to the throttle page"""
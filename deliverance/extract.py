@@ -0,0 +1,200 @@
+import logging
+
+from config import Locators, SlotLocators
+from .elements import CartItem, child_xpath
+from .exceptions import SlotDateElementAmbiguous
+from .records import SLOT_CLASSES, SlotRecord, DateRecord
+from .utils import locator_xpath
+
+log = logging.getLogger(__name__)
+
+# Collects the data for every available slot in a single WebDriver round trip
+# arguments[0]: spec dict built by `slot_spec()`
+EXTRACT_SLOTS_JS = """
+var spec = arguments[0];
+function nodes(xpath, ctx) {
+  var res = document.evaluate(xpath, ctx || document, null,
+                              XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+  var out = [];
+  for (var i = 0; i < res.snapshotLength; i++) {
+    out.push(res.snapshotItem(i));
+  }
+  return out;
+}
+function text(xpath, ctx) {
+  if (!xpath) { return null; }
+  var node = nodes(xpath, ctx)[0];
+  return node ? node.innerText.trim() : null;
+}
+function dateKey(value) {
+  if (!value || !spec.date_id_pattern) { return value || null; }
+  var match = value.match(new RegExp(spec.date_id_pattern));
+  return match ? match[0] : null;
+}
+var dateIndex = {};
+nodes(spec.date_index).forEach(function(button) {
+  var key = dateKey(button.getAttribute(spec.date_index_attr));
+  (dateIndex[key] = dateIndex[key] || []).push(button);
+});
+var slots = [];
+nodes(spec.slot).forEach(function(slot, index) {
+  var dateId = null;
+  if (spec.date_ancestor) {
+    var ancestor = nodes('./ancestor::' + spec.date_ancestor, slot)[0];
+    dateId = ancestor ? ancestor.id : null;
+  } else {
+    dateId = dateKey(slot.id);
+  }
+  var dates = dateIndex[dateId] || [];
+  var delivery = null;
+  if (spec.delivery_type_pattern) {
+    delivery = slot.id.match(new RegExp(spec.delivery_type_pattern));
+  }
+  slots.push({
+    id: slot.id || null,
+    index: index,
+    window: text(spec.window, slot),
+    price: text(spec.price, slot),
+    delivery_type: delivery ? delivery[0] : null,
+    date_id: dateId,
+    date_count: dates.length,
+    date_texts: dates.length ? spec.date_texts.map(function(x) {
+      return text(x, dates[0]);
+    }) : []
+  });
+});
+return slots;
+"""
+
+# Hashes the ids and text of the available slots, so unchanged slot pages can
+# be detected without reading any slot data. Returns null if neither slot
+# container is on the page
+# arguments[0]: list of [slot type, container XPATH, slot XPATH]
+FINGERPRINT_JS = """
+function nodes(xpath) {
+  var res = document.evaluate(xpath, document, null,
+                              XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+  var out = [];
+  for (var i = 0; i < res.snapshotLength; i++) {
+    out.push(res.snapshotItem(i));
+  }
+  return out;
+}
+var specs = arguments[0];
+for (var i = 0; i < specs.length; i++) {
+  if (!nodes(specs[i][1]).length) { continue; }
+  var slots = nodes(specs[i][2]);
+  var text = slots.map(function(s) {
+    return s.id + '|' + s.innerText;
+  }).join('||');
+  var hash = 5381;
+  for (var j = 0; j < text.length; j++) {
+    hash = ((hash << 5) + hash + text.charCodeAt(j)) | 0;
+  }
+  return [specs[i][0], slots.length, hash].join(':');
+}
+return null;
+"""
+
+# Reads every cart row in a single WebDriver round trip
+# arguments[0]: spec dict built by `cart_spec()`
+EXTRACT_CART_JS = """
+var spec = arguments[0];
+function nodes(xpath, ctx) {
+  var res = document.evaluate(xpath, ctx || document, null,
+                              XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+  var out = [];
+  for (var i = 0; i < res.snapshotLength; i++) {
+    out.push(res.snapshotItem(i));
+  }
+  return out;
+}
+function text(xpath, ctx) {
+  var node = nodes(xpath, ctx)[0];
+  return node ? node.innerText.trim() : null;
+}
+return nodes(spec.row).map(function(row) {
+  var link = nodes(spec.link, row)[0];
+  return {
+    name: text(spec.name, row),
+    quantity: text(spec.quantity, row),
+    price: text(spec.price, row),
+    product_id: row.getAttribute('data-asin'),
+    link: link ? link.href : null
+  };
+});
+"""
+
+
+def slot_fingerprint(driver):
+    """Fingerprint the available slots on the current page in one call"""
+    return driver.execute_script(FINGERPRINT_JS, [
+        [slot_type,
+         locator_xpath(SlotLocators(slot_type).CONTAINER),
+         SlotLocators(slot_type).SLOT[1]]
+        for slot_type in ['multi', 'single']
+    ])
+
+
+def slot_spec(slot_type):
+    """Build the XPATHs used by EXTRACT_SLOTS_JS for the given slot type"""
+    slot_cls = SLOT_CLASSES[slot_type]
+    return {
+        'slot': SlotLocators(slot_type).SLOT[1],
+        'window': child_xpath(slot_cls.STR_XPATH[0]),
+        'price': (child_xpath(slot_cls.STR_XPATH[1])
+                  if len(slot_cls.STR_XPATH) > 1 else None),
+        'date_ancestor': slot_cls.DATE_ANCESTOR,
+        'date_id_pattern': slot_cls.DATE_ID_PATTERN,
+        'delivery_type_pattern': getattr(slot_cls, 'DELIVERY_TYPE_PATTERN',
+                                         None),
+        'date_index': slot_cls.DATE_INDEX_XPATH,
+        'date_index_attr': slot_cls.DATE_INDEX_ATTR,
+        'date_texts': [child_xpath(x) for x in slot_cls.DATE_CLS.STR_XPATH]
+    }
+
+
+def build_slot_records(driver, slot_type, raw_slots):
+    """Convert raw slot dicts into SlotRecords, checking date matches"""
+    date_cls = SLOT_CLASSES[slot_type].DATE_CLS
+    slots = []
+    for raw in raw_slots:
+        if raw['date_count'] != 1:
+            raise SlotDateElementAmbiguous(
+                'Expected 1 date element but found {}'.format(
+                    raw['date_count']
+                )
+            )
+        slots.append(SlotRecord(
+            driver,
+            slot_type,
+            raw['window'],
+            DateRecord(raw['date_texts'], date_cls, id=raw['date_id']),
+            price=raw['price'],
+            delivery_type=raw['delivery_type'],
+            id=raw['id'],
+            index=raw['index']
+        ))
+    return slots
+
+
+def extract_slots(driver, slot_type):
+    """Extract every available slot with one `execute_script` call"""
+    raw_slots = driver.execute_script(EXTRACT_SLOTS_JS, slot_spec(slot_type))
+    return build_slot_records(driver, slot_type, raw_slots or [])
+
+
+def cart_spec():
+    """Build the XPATHs used by EXTRACT_CART_JS"""
+    return {
+        'row': Locators.CART_ITEMS[1],
+        'name': child_xpath(CartItem.STR_XPATH[0]),
+        'quantity': child_xpath(CartItem.STR_XPATH[1]),
+        'price': child_xpath(CartItem.PRICE_XPATH),
+        'link': child_xpath(CartItem.LINK_XPATH)
+    }
+
+
+def extract_cart(driver):
+    """Read every cart row into `CartItem.data` dicts with one call"""
+    return driver.execute_script(EXTRACT_CART_JS, cart_spec()) or []
@@ -0,0 +1,220 @@
+import logging
+import os
+import queue
+import sqlite3
+import threading
+from collections import Counter
+from datetime import datetime
+from time import time
+
+from .elements import SlotElementMulti
+
+log = logging.getLogger(__name__)
+
+SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS observation (
+        ts REAL NOT NULL,
+        service TEXT NOT NULL,
+        date TEXT NOT NULL,
+        window TEXT NOT NULL,
+        price TEXT,
+        delivery_type TEXT,
+        seen INTEGER NOT NULL
+    )""",
+    """CREATE INDEX IF NOT EXISTS observation_slot
+        ON observation (service, date, window, ts)""",
+    """CREATE INDEX IF NOT EXISTS observation_ts ON observation (ts)"""
+]
+
+_STOP = object()
+
+
+def observe(slot):
+    """The stored fields of a SlotRecord (plain data, so free to read)"""
+    return {
+        'date': str(slot._date_element),
+        'window': slot.window,
+        'price': slot.price,
+        'delivery_type': slot.delivery_type
+    }
+
+
+def observe_name(full_name, multi=False):
+    """
+    The stored fields of a SlotElement, from the full name already read for
+    preference matching. Reading its price or full date would cost
+    WebDriver round trips per slot on every poll
+    """
+    date, window = full_name.split('::', 1)
+    delivery_type = None
+    if multi:
+        delivery_type, window = window.split(SlotElementMulti.STR_SEP, 1)
+    return {
+        'date': date,
+        'window': window,
+        'price': None,
+        'delivery_type': delivery_type
+    }
+
+
+class SlotHistory:
+    """
+    Append-only SQLite log of slot observations
+
+    Each poll records a row for every available slot (seen = 1) and for
+    each slot that was available on the previous poll but is now gone
+    (seen = 0). Rows are written in batches by a background thread, so
+    recording never waits on disk
+    """
+
+    def __init__(self, path, batch_size=200, flush_interval=2):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue = queue.Queue()
+        self.previous = {}
+        with sqlite3.connect(path) as conn:
+            for statement in SCHEMA:
+                conn.execute(statement)
+        self.thread = threading.Thread(target=self.write, daemon=True,
+                                       name='slot-history')
+        self.thread.start()
+
+    def record(self, service, observations, when=None):
+        """
+        Queue one poll's observations: a dict (see `observe`) for each
+        available slot
+        """
+        ts = when or time()
+        current = {(obs['date'], obs['window']): obs for obs in observations}
+        rows = [(ts, service, o['date'], o['window'], o['price'],
+                 o['delivery_type'], 1) for o in current.values()]
+        rows.extend(
+            (ts, service, o['date'], o['window'], o['price'],
+             o['delivery_type'], 0)
+            for key, o in self.previous.get(service, {}).items()
+            if key not in current
+        )
+        self.previous[service] = current
+        if rows:
+            self.queue.put(rows)
+
+    def record_unchanged(self, service, when=None):
+        """
+        Queue a poll on which the available slots were the same as on the
+        previous one, without reading them again
+        """
+        ts = when or time()
+        rows = [(ts, service, o['date'], o['window'], o['price'],
+                 o['delivery_type'], 1)
+                for o in self.previous.get(service, {}).values()]
+        if rows:
+            self.queue.put(rows)
+
+    def write(self):
+        conn = sqlite3.connect(self.path)
+        batch = []
+        stopping = False
+        while not stopping:
+            try:
+                item = self.queue.get(timeout=self.flush_interval)
+                if item is _STOP:
+                    stopping = True
+                else:
+                    batch.extend(item)
+            except queue.Empty:
+                pass
+            if batch and (stopping or len(batch) >= self.batch_size
+                          or self.queue.empty()):
+                try:
+                    with conn:
+                        conn.executemany(
+                            'INSERT INTO observation VALUES (?,?,?,?,?,?,?)',
+                            batch
+                        )
+                except sqlite3.Error:
+                    log.error('Failed to write slot history', exc_info=True)
+                batch = []
+        conn.close()
+
+    def close(self, timeout=10):
+        self.queue.put(_STOP)
+        self.thread.join(timeout)
+
+
+def iter_episodes(path, service=None):
+    """
+    Yield (service, date, window, appeared, disappeared) for every period a
+    slot was available. `disappeared` is None if the slot was still
+    available at the last observation
+    """
+    query = 'SELECT service, date, window, ts, seen FROM observation'
+    params = ()
+    if service:
+        query += ' WHERE service = ?'
+        params = (service,)
+    query += ' ORDER BY service, date, window, ts'
+    with sqlite3.connect(path) as conn:
+        key = None
+        appeared = None
+        for svc, date, window, ts, seen in conn.execute(query, params):
+            if (svc, date, window) != key:
+                if appeared is not None:
+                    yield key + (appeared, None)
+                key = (svc, date, window)
+                appeared = None
+            if seen and appeared is None:
+                appeared = ts
+            elif not seen and appeared is not None:
+                yield key + (appeared, ts)
+                appeared = None
+        if appeared is not None:
+            yield key + (appeared, None)
+
+
+def release_histogram(path, service=None):
+    """Count slot releases by hour of day"""
+    return Counter(
+        datetime.fromtimestamp(appeared).hour
+        for _, _, _, appeared, _ in iter_episodes(path, service)
+    )
+
+
+def release_minutes(path, service=None, limit=500):
+    """Minutes after midnight of the most recent slot releases"""
+    releases = sorted(e[3] for e in iter_episodes(path, service))[-limit:]
+    return [datetime.fromtimestamp(t).hour * 60
+            + datetime.fromtimestamp(t).minute for t in releases]
+
+
+def lifetimes(path, service=None):
+    """Seconds each slot stayed available, for completed episodes"""
+    return [disappeared - appeared for _, _, _, appeared, disappeared
+            in iter_episodes(path, service) if disappeared is not None]
+
+
+def report(path, query, service=None):
+    """Print a release time histogram or slot lifetime summary"""
+    if not os.path.exists(path):
+        print("No slot history found at '{}'".format(path))
+        return
+    if query == 'releases':
+        counts = release_histogram(path, service)
+        total = sum(counts.values())
+        print('Slot releases by hour ({} total)'.format(total))
+        for hour in range(24):
+            n = counts.get(hour, 0)
+            print('{:02d}:00 {:>6} {}'.format(
+                hour, n, '#' * int(50 * n / max(counts.values() or [1]))
+            ))
+    elif query == 'lifetime':
+        values = sorted(lifetimes(path, service))
+        print('Slot lifetime ({} completed episodes)'.format(len(values)))
+        if not values:
+            return
+        for label, pct in [('min', 0), ('p25', 25), ('median', 50),
+                           ('p75', 75), ('p95', 95), ('max', 100)]:
+            value = values[min(len(values) - 1, len(values) * pct // 100)]
+            print('{:>7}: {:>8.1f}s'.format(label, value))
+    else:
+        raise ValueError("Unknown history query '{}'".format(query))
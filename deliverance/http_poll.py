@@ -0,0 +1,115 @@
+import logging
+import requests
+from time import perf_counter
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from .exceptions import PollFallback, PollThrottled
+from .metrics import LatencyStats
+from .notify import HTTP_TIMEOUT
+from .parse import PageSnapshot
+from .utils import remove_qs
+
+log = logging.getLogger(__name__)
+
+# Only retry a connection that failed before the request went out (e.g. a
+# pooled connection the server closed). Timeouts and error statuses, 429
+# and 503 included, go straight to the caller, which falls back to the
+# browser or backs off, rather than hitting a throttled site again
+POLL_RETRY = Retry(total=1, connect=1, read=0)
+
+
+class HttpPoller:
+    """
+    Polls the slot select page over plain HTTP
+
+    Uses the cookies of the authenticated browser session and parses the
+    page locally. Raises PollFallback whenever the response isn't a usable
+    slot select page (expired session, auth / throttle / OOS redirect), so
+    the caller can fall back to the browser
+
+    base_url: Defaults to the site's BASE_URL. Point it at a local stand-in
+              server for testing
+    """
+
+    def __init__(self, site_config, base_url=None, timeout=HTTP_TIMEOUT):
+        self.site_config = site_config
+        self.base_url = base_url or site_config.BASE_URL
+        self.timeout = timeout
+        self.latency = LatencyStats()
+        self.ready = False
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=2,
+                              max_retries=POLL_RETRY)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    @property
+    def slot_path(self):
+        return self.site_config.routes['SLOT_SELECT']['waypoints'][-1][1]
+
+    @property
+    def slot_url(self):
+        return self.base_url + self.slot_path
+
+    def load_cookies(self, cookies, user_agent=None):
+        """Load cookies as returned by WebDriver's `get_cookies()`"""
+        self.session.cookies.clear()
+        for cookie in cookies:
+            self.session.cookies.set(
+                cookie['name'], cookie['value'],
+                domain=cookie.get('domain', ''), path=cookie.get('path', '/')
+            )
+        if user_agent:
+            self.session.headers['User-Agent'] = user_agent
+        self.ready = True
+        log.debug('Loaded {} cookies for HTTP polling'.format(len(cookies)))
+
+    def sync_from_driver(self, driver):
+        self.load_cookies(driver.get_cookies(),
+                          driver.execute_script('return navigator.userAgent'))
+
+    def invalidate(self):
+        """Force a cookie sync from the browser before the next poll"""
+        self.ready = False
+
+    def check_response(self, response):
+        url = remove_qs(response.url)
+        patterns = self.site_config.Patterns
+        auth_url = patterns.AUTH_URL.replace(self.site_config.BASE_URL,
+                                             self.base_url)
+        if auth_url in url:
+            raise PollFallback('Redirected to auth: {}'.format(url))
+        elif patterns.THROTTLE_URL in url:
+            raise PollThrottled('Throttled: {}'.format(url))
+        elif patterns.OOS_URL in url:
+            raise PollFallback('Redirected to OOS alert: {}'.format(url))
+        elif self.slot_path not in url:
+            raise PollFallback('Unexpected redirect: {}'.format(url))
+        elif response.status_code in [429, 503]:
+            raise PollThrottled('HTTP {} from {}'.format(
+                response.status_code, url
+            ))
+        elif response.status_code != 200:
+            raise PollFallback('HTTP {} from {}'.format(
+                response.status_code, url
+            ))
+
+    def fetch(self, driver=None):
+        """Fetch and parse the slot select page"""
+        t = perf_counter()
+        try:
+            response = self.session.get(self.slot_url, timeout=self.timeout)
+        except requests.exceptions.RequestException as e:
+            raise PollFallback('Request failed: {}'.format(e))
+        self.check_response(response)
+        snapshot = PageSnapshot(response.text, response.url, driver=driver)
+        self.latency.add(perf_counter() - t)
+        return snapshot
+
+    def get_slots(self, driver=None):
+        """Return all available slots as SlotRecords"""
+        snapshot = self.fetch(driver)
+        if not snapshot.has_slot_container():
+            raise PollFallback('No slot container found (session expired?)')
+        return snapshot.slots()
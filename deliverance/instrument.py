@@ -0,0 +1,124 @@
+import atexit
+import logging
+from collections import defaultdict
+from contextlib import contextmanager
+from functools import wraps
+from time import perf_counter
+
+from .metrics import LatencyStats
+
+log = logging.getLogger(__name__)
+
+# The active recorder. None unless instrumentation has been enabled, in which
+# case `phase` wrappers only cost a global lookup
+recorder = None
+
+
+class CommandRecorder:
+    """
+    Counts and times every WebDriver command, grouped by the innermost phase
+    (decorated Browser method) that issued it
+
+    Attaching replaces the driver instance's `execute` method, which both
+    the driver and its WebElements send every command through. Histograms
+    are logged every `interval` seconds (checked as commands are issued)
+    and at exit
+    """
+
+    def __init__(self, interval=300):
+        self.interval = interval
+        self.commands = defaultdict(LatencyStats)
+        self.phases = defaultdict(LatencyStats)
+        self.stack = []
+        self.issued = 0
+        self.dumped = 0
+        self.next_dump = perf_counter() + interval if interval else None
+
+    def attach(self, driver):
+        execute = driver.execute
+
+        @wraps(execute)
+        def timed_execute(driver_command, params=None):
+            t = perf_counter()
+            try:
+                return execute(driver_command, params)
+            finally:
+                now = perf_counter()
+                self.issued += 1
+                current = self.stack[-1] if self.stack else 'other'
+                self.commands[(current, driver_command)].add(now - t)
+                if self.next_dump and now >= self.next_dump:
+                    self.next_dump = now + self.interval
+                    self.dump()
+
+        driver.execute = timed_execute
+        return driver
+
+    @contextmanager
+    def phase(self, name):
+        self.stack.append(name)
+        t = perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name].add(perf_counter() - t)
+            self.stack.pop()
+
+    def summary(self):
+        """Phase wall times and per-command latency, keyed by phase"""
+        summary = {}
+        for name, stats in self.phases.items():
+            summary[name] = {'wall': stats.summary(), 'commands': {}}
+        for (name, command), stats in self.commands.items():
+            entry = summary.setdefault(name, {'wall': None, 'commands': {}})
+            entry['commands'][command] = stats.summary()
+        return summary
+
+    def dump(self):
+        """Log the histograms, unless no commands were issued since the last"""
+        if self.issued == self.dumped:
+            return
+        self.dumped = self.issued
+        lines = ['WebDriver command latency by phase:']
+        phases = sorted(set(self.phases) | {p for p, _ in self.commands})
+        for name in phases:
+            commands = sorted(
+                ((c, s) for (p, c), s in self.commands.items() if p == name),
+                key=lambda item: -item[1].total
+            )
+            command_time = sum(s.total for _, s in commands)
+            wall = self.phases.get(name)
+            lines.append('  {}: {} commands, {:.1f}ms in WebDriver'.format(
+                name, sum(s.count for _, s in commands), command_time * 1000
+            ))
+            if wall:
+                lines.append('    wall time: {}'.format(wall))
+            for command, stats in commands:
+                lines.append('    {}: {}'.format(command, stats))
+                lines.append('      {}'.format(' '.join(
+                    '{}:{}'.format(label, n) for label, n in stats.histogram()
+                )))
+        log.info('\n'.join(lines))
+
+
+def enable(driver, interval=300):
+    """Instrument `driver` and record phases until exit"""
+    global recorder
+    recorder = CommandRecorder(interval)
+    recorder.attach(driver)
+    atexit.register(recorder.dump)
+    log.info('WebDriver instrumentation enabled')
+    return recorder
+
+
+def phase(name):
+    """Attribute WebDriver commands issued by the decorated call to `name`"""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if recorder is None:
+                return func(*args, **kwargs)
+            with recorder.phase(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
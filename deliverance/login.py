@@ -0,0 +1,54 @@
+import logging
+
+log = logging.getLogger(__name__)
+
+
+class LoginCache:
+    """
+    Caches the logged in state against the session cookies that carry it
+
+    A cached state holds until the login cookies change or `invalidate()`
+    is called (whenever an auth page is seen). Checking costs one
+    `get_cookies()` call instead of a DOM query
+    """
+
+    def __init__(self, driver, cookie_names):
+        self.driver = driver
+        self.cookie_names = set(cookie_names)
+        self.state = None
+        self.key = None
+        self.hits = 0
+        self.misses = 0
+
+    def cookie_key(self):
+        """The name and value of each login cookie currently set"""
+        return tuple(sorted(
+            (c['name'], c['value']) for c in self.driver.get_cookies()
+            if c['name'] in self.cookie_names
+        ))
+
+    def lookup(self):
+        """Return `(state, key)`. state is None if nothing valid is cached"""
+        key = self.cookie_key()
+        if self.state is not None and key == self.key:
+            self.hits += 1
+            return self.state, key
+        if self.state is not None:
+            log.info('Login cookies changed')
+        self.misses += 1
+        return None, key
+
+    def store(self, state, key):
+        self.state = state
+        self.key = key
+
+    def invalidate(self):
+        if self.state is not None:
+            log.debug('Login state invalidated')
+        self.state = None
+        self.key = None
+
+    def __str__(self):
+        return 'state: {}, hits: {}, misses: {}'.format(
+            self.state, self.hits, self.misses
+        )
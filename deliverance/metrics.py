@@ -0,0 +1,129 @@
+import threading
+from bisect import bisect_left
+from time import perf_counter
+
+
+class LatencyStats:
+    """Running latency summary with a fixed log-scale histogram"""
+    BUCKETS_MS = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000,
+                  10000, 30000, 60000]
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = None
+        self.buckets = [0] * (len(self.BUCKETS_MS) + 1)
+        self._lock = threading.Lock()
+
+    def add(self, seconds):
+        with self._lock:
+            self.count += 1
+            self.total += seconds
+            if self.min is None or seconds < self.min:
+                self.min = seconds
+            if self.max is None or seconds > self.max:
+                self.max = seconds
+            self.buckets[bisect_left(self.BUCKETS_MS, seconds * 1000)] += 1
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else 0
+
+    def percentile(self, pct):
+        """Estimate a percentile (ms) as the upper bound of its bucket"""
+        if not self.count:
+            return None
+        target = self.count * pct / 100
+        seen = 0
+        for i, n in enumerate(self.buckets):
+            seen += n
+            if seen >= target:
+                if i < len(self.BUCKETS_MS):
+                    return min(self.BUCKETS_MS[i], self.max * 1000)
+                break
+        return self.max * 1000
+
+    def histogram(self):
+        """Return `(label, count)` pairs for the non-empty buckets"""
+        labels = ['<={}ms'.format(b) for b in self.BUCKETS_MS]
+        labels.append('>{}ms'.format(self.BUCKETS_MS[-1]))
+        return [(label, n) for label, n in zip(labels, self.buckets) if n]
+
+    def summary(self):
+        if not self.count:
+            return {'count': 0}
+        return {
+            'count': self.count,
+            'total_ms': round(self.total * 1000, 1),
+            'mean_ms': round(self.total / self.count * 1000, 1),
+            'min_ms': round(self.min * 1000, 1),
+            'max_ms': round(self.max * 1000, 1),
+            'p50_ms': round(self.percentile(50), 1),
+            'p95_ms': round(self.percentile(95), 1)
+        }
+
+    def __str__(self):
+        return ', '.join('{}: {}'.format(k, v) for k, v in
+                         self.summary().items())
+
+
+class SkipStats:
+    """Counts skipped work and the (estimated) time it saved"""
+
+    def __init__(self):
+        self.polls = 0
+        self.skipped = 0
+        self.saved = 0
+
+    def record(self, skipped, saved=0):
+        self.polls += 1
+        if skipped:
+            self.skipped += 1
+            self.saved += saved
+
+    @property
+    def rate(self):
+        return self.skipped / self.polls if self.polls else 0
+
+    def __str__(self):
+        return 'skipped {}/{} ({:.0%}), ~{:.1f}s saved'.format(
+            self.skipped, self.polls, self.rate, self.saved
+        )
+
+
+class StartupTimer:
+    """
+    Time from process start to the first poll, split into steps. Steps
+    marked after `finish()` are ignored
+    """
+
+    def __init__(self, started=None):
+        self.started = started if started is not None else perf_counter()
+        self.last = self.started
+        self.steps = []
+        self.finished = False
+
+    def finish(self, step='first_poll'):
+        """Mark the last step. Returns False if already finished"""
+        if self.finished:
+            return False
+        self.mark(step)
+        self.finished = True
+        return True
+
+    def mark(self, step):
+        if self.finished:
+            return
+        now = perf_counter()
+        self.steps.append((step, now - self.last))
+        self.last = now
+
+    @property
+    def total(self):
+        return self.last - self.started
+
+    def __str__(self):
+        return '{:.2f}s ({})'.format(self.total, ', '.join(
+            '{}: {:.2f}s'.format(step, t) for step, t in self.steps
+        ))
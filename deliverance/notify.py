@@ -1,49 +1,190 @@
 import logging
-import requests
 import os
+import threading
+from collections import namedtuple
+from time import perf_counter
 from random import random
-from twilio.rest import Client as TwilioClient
+from urllib3.util.retry import Retry
 import platform
 
-from .utils import conf_dependent
+from .utils import conf_dependent, is_configured
 
 log = logging.getLogger(__name__)
 
+# requests and twilio are imported when a backend first needs them, so
+# startup doesn't pay for backends that aren't configured
+
+TELEGRAM_API = 'https://api.telegram.org'
+# (connect, read) timeouts in seconds
+HTTP_TIMEOUT = (3.05, 10)
+
+Backend = namedtuple('Backend', ['name', 'send', 'concurrency', 'conf_key',
+                                 'required', 'remote'])
+BACKENDS = {}
+
+_sessions = {}
+_twilio_clients = {}
+_pool_lock = threading.Lock()
+
+
+def register_backend(name, conf_key=None, required=(), concurrency=1,
+                     remote=True):
+    """
+    Register a function as a notification backend for the Dispatcher
+
+    The function is called with the message and must return a value other
+    than None on success
+    """
+    def decorator(func):
+        BACKENDS[name] = Backend(name, func, concurrency, conf_key, required,
+                                 remote)
+        return func
+    return decorator
+
+
+def message_retry():
+    """
+    Retry sending a message only when it can't have been delivered: on
+    connection errors and 429 responses, whatever the method. A read
+    timeout or a 5xx may come after the message went out, and retrying
+    those sends duplicate alerts
+    """
+    return Retry(total=3, connect=3, read=0, status=3, backoff_factor=.3,
+                 status_forcelist=[429], method_whitelist=False)
+
+
+def get_session(backend):
+    """Return the long-lived, pooled HTTP session for a message backend"""
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    with _pool_lock:
+        if backend not in _sessions:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=4,
+                                  max_retries=message_retry())
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            _sessions[backend] = session
+        return _sessions[backend]
+
+
+def get_twilio_client(conf):
+    """Return a pooled Twilio client, cached per set of credentials"""
+    from twilio.rest import Client as TwilioClient
+    from twilio.http.http_client import TwilioHttpClient
+
+    key = (conf['sid'], conf['token'])
+    with _pool_lock:
+        if key not in _twilio_clients:
+            _twilio_clients[key] = TwilioClient(
+                conf['sid'], conf['token'],
+                http_client=TwilioHttpClient(pool_connections=True,
+                                             timeout=HTTP_TIMEOUT,
+                                             max_retries=message_retry())
+            )
+        return _twilio_clients[key]
+
+
+def telegram_url(conf, method):
+    return '{}/bot{}/{}'.format(
+        conf.get('api_url', TELEGRAM_API).rstrip('/'), conf['token'], method
+    )
+
 
+@conf_dependent('telegram')
+def warm_telegram(conf):
+    get_session('telegram').get(telegram_url(conf, 'getMe'),
+                                timeout=HTTP_TIMEOUT)
+    log.debug('Telegram connection pool ready')
+
+
+@conf_dependent('twilio')
+def warm_twilio(conf):
+    get_twilio_client(conf).api.accounts(conf['sid']).fetch()
+    log.debug('Twilio connection pool ready')
+
+
+def warm_up():
+    """Open pooled connections to the configured backends in the background"""
+    for conf_key, warm in [('telegram', warm_telegram),
+                           ('twilio', warm_twilio)]:
+        if is_configured(conf_key):
+            threading.Thread(target=warm, daemon=True).start()
+
+
+@register_backend('telegram', 'telegram', required=('token', 'chat_id'))
 @conf_dependent('telegram')
 def send_telegram(body, conf):
     log.info('Sending Telegram message (chat_id: {}, len: {})'.format(
         conf['chat_id'], len(body)
     ))
-    response = requests.get(
-        'https://api.telegram.org/bot{}/sendMessage?'
-        'chat_id={}&parse_mode=Markdown&text={}'.format(
-            conf['token'],
-            conf['chat_id'],
-            body
-        )
+    t = perf_counter()
+    response = get_session('telegram').get(
+        telegram_url(conf, 'sendMessage'),
+        params={
+            'chat_id': conf['chat_id'],
+            'parse_mode': 'Markdown',
+            'text': body
+        },
+        timeout=HTTP_TIMEOUT
     ).json()
+    log.info('Telegram request completed in {:.0f}ms'.format(
+        (perf_counter() - t) * 1000
+    ))
 
     if not response.get('ok'):
-        raise requests.exceptions.HTTPError(response)
+        from requests.exceptions import HTTPError
+        raise HTTPError(response)
     else:
         return response
 
 
+@register_backend('sms', 'twilio', required=('sid', 'token'))
 @conf_dependent('twilio')
 def send_sms(body, conf):
-    client = TwilioClient(conf['sid'], conf['token'])
+    client = get_twilio_client(conf)
     log.info('Sending SMS (num: {}, len: {})'.format(
         conf['to_num'], len(body)
     ))
+    t = perf_counter()
     result = client.messages.create(
         body=body,
         from_=conf['from_num'],
         to=conf['to_num']
     )
+    log.info('SMS request completed in {:.0f}ms'.format(
+        (perf_counter() - t) * 1000
+    ))
     return result
 
 
+@register_backend('webhook', 'webhook', required=('url',))
+@conf_dependent('webhook')
+def send_webhook(body, conf):
+    log.info('Sending webhook (url: {}, len: {})'.format(
+        conf['url'], len(body)
+    ))
+    t = perf_counter()
+    response = get_session('webhook').post(
+        conf['url'], json={'text': body}, timeout=HTTP_TIMEOUT
+    )
+    response.raise_for_status()
+    log.info('Webhook request completed in {:.0f}ms'.format(
+        (perf_counter() - t) * 1000
+    ))
+    return response
+
+
+@register_backend('audio', remote=False)
+def play_audio(message, sound='Blow', annoy_user=False):
+    if annoy_user:
+        annoy()
+    else:
+        alert(message, sound)
+    return True
+
+
 def alert(message, sound='Blow'):
     log.info("Alerting user with message: '{}'".format(message))
     try:
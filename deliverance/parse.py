@@ -0,0 +1,148 @@
+import logging
+import re
+from urllib.parse import urljoin
+
+from config import Locators, Patterns, SlotLocators
+from .elements import child_xpath, CartItem, PaymentRow
+from .extract import slot_spec, build_slot_records
+from .records import SLOT_CLASSES, PaymentRecord
+from .utils import locator_xpath
+
+log = logging.getLogger(__name__)
+
+
+def get_node_text(node):
+    """
+    Approximate `innerText` for an lxml node
+
+    Whitespace runs are collapsed to a single space, so multi-line labels
+    may differ slightly from the text read through WebDriver
+    """
+    return ' '.join(node.text_content().split())
+
+
+class PageSnapshot:
+    """A copy of the page source, queried locally with lxml"""
+
+    def __init__(self, source, url='', driver=None):
+        self.url = url
+        self.driver = driver
+        # Imported on first use. Only some extract modes parse pages locally
+        from lxml import html
+        self.tree = html.fromstring(source)
+
+    @classmethod
+    def from_driver(cls, driver):
+        return cls(driver.page_source, driver.current_url, driver=driver)
+
+    def find_all(self, locator_or_xpath, node=None):
+        if isinstance(locator_or_xpath, tuple):
+            locator_or_xpath = locator_xpath(locator_or_xpath)
+        return (self.tree if node is None else node).xpath(locator_or_xpath)
+
+    def find_child(self, node, xpath_or_pattern):
+        children = node.xpath(child_xpath(xpath_or_pattern))
+        if not children:
+            raise ValueError("No children found with xpath: '{}'".format(
+                xpath_or_pattern
+            ))
+        return children[0]
+
+    def child_text(self, node, xpath_or_pattern):
+        if not xpath_or_pattern:
+            return None
+        children = node.xpath(xpath_or_pattern)
+        return get_node_text(children[0]) if children else None
+
+    def has_slot_container(self):
+        return any(self.find_all(SlotLocators(slot_type).CONTAINER)
+                   for slot_type in ['single', 'multi'])
+
+    def slot_type(self):
+        if self.find_all(SlotLocators('multi').CONTAINER):
+            return 'multi'
+        return 'single'
+
+    def slots(self, slot_type=None):
+        """Parse available slots into SlotRecords"""
+        slot_type = slot_type or self.slot_type()
+        slot_cls = SLOT_CLASSES[slot_type]
+        spec = slot_spec(slot_type)
+        date_index = {}
+        for button in self.find_all(spec['date_index']):
+            date_index.setdefault(
+                slot_cls.date_key(button.get(spec['date_index_attr'])), []
+            ).append(button)
+        raw_slots = []
+        for index, slot in enumerate(self.find_all(spec['slot'])):
+            slot_id = slot.get('id') or ''
+            if spec['date_ancestor']:
+                ancestors = slot.xpath('./ancestor::' + spec['date_ancestor'])
+                date_id = ancestors[0].get('id') if ancestors else None
+            else:
+                date_id = slot_cls.date_key(slot_id)
+            dates = date_index.get(date_id, [])
+            delivery_type = None
+            if spec['delivery_type_pattern']:
+                match = re.search(spec['delivery_type_pattern'], slot_id)
+                delivery_type = match.group() if match else None
+            raw_slots.append({
+                'id': slot_id or None,
+                'index': index,
+                'window': self.child_text(slot, spec['window']),
+                'price': self.child_text(slot, spec['price']),
+                'delivery_type': delivery_type,
+                'date_id': date_id,
+                'date_count': len(dates),
+                'date_texts': [self.child_text(dates[0], x)
+                               for x in spec['date_texts']] if dates else []
+            })
+        return build_slot_records(self.driver, slot_type, raw_slots)
+
+    def cart_items(self):
+        """Parse cart rows into the same dicts as `CartItem.data`"""
+        cart = []
+        for node in self.find_all(Locators.CART_ITEMS):
+            links = node.xpath(child_xpath(CartItem.LINK_XPATH))
+            cart.append({
+                'name': self.child_text(
+                    node, child_xpath(CartItem.STR_XPATH[0])
+                ),
+                'quantity': self.child_text(
+                    node, child_xpath(CartItem.STR_XPATH[1])
+                ),
+                'price': self.child_text(
+                    node, child_xpath(CartItem.PRICE_XPATH)
+                ),
+                'product_id': node.get('data-asin'),
+                'link': (urljoin(self.url, links[0].get('href'))
+                         if links else None)
+            })
+        return cart
+
+    def removed_items(self, pattern=Patterns.OOS):
+        """Parse out of stock rows into `{'text', 'product_id'}` dicts"""
+        removed = []
+        for node in self.find_all(Locators.OOS_ITEM):
+            text = get_node_text(node)
+            if pattern in text:
+                removed.append({
+                    'text': text.split(pattern)[0],
+                    'product_id': self.find_all(
+                        Locators.OOS_ITEM_ASIN, node
+                    )[0].get('value')
+                })
+        return removed
+
+    def payment_rows(self):
+        """Parse payment rows into PaymentRecords"""
+        rows = []
+        for index, node in enumerate(self.find_all(Locators.PAYMENT_ROW)):
+            try:
+                text = get_node_text(
+                    self.find_child(node, PaymentRow.CARD_XPATH)
+                )
+            except ValueError:
+                continue
+            rows.append(PaymentRecord(self.driver, text.split(' ')[-1], index))
+        return rows
@@ -0,0 +1,109 @@
+import logging
+import re
+
+from .utils import conf_dependent
+
+log = logging.getLogger(__name__)
+
+
+def clean_slotname(slot_or_str):
+    if isinstance(slot_or_str, str):
+        name = slot_or_str
+    else:
+        name = slot_or_str.full_name
+    return name.lower().replace(' ', '')
+
+
+def check_prefs(prefs):
+    """
+    Raise ValueError unless `prefs` has the shape of conf.toml's
+    `slot_preference` section: day names mapped to lists of windows
+    """
+    if not isinstance(prefs, dict):
+        raise ValueError('Slot preferences must map days to lists of windows')
+    for day, windows in prefs.items():
+        if not isinstance(windows, list) or not all(
+                isinstance(w, str) for w in windows):
+            raise ValueError(
+                "Windows for '{}' must be a list of strings".format(day)
+            )
+
+
+@conf_dependent('slot_preference')
+def get_prefs_from_conf(conf):
+    log.info('Reading slot preferences from conf: {}'.format(conf))
+    prefs = []
+    for day, windows in conf.items():
+        for window in windows:
+            if window.lower() == 'any':
+                if day.lower() == 'any':
+                    log.info("'Any' day, 'Any' time specified. "
+                             "Will look for first available slot")
+                    return None
+                prefs.append(day.lower())
+            else:
+                prefs.append(clean_slotname('::'.join([day, window])))
+    return prefs
+
+
+class SlotPrefMatcher:
+    """
+    Slot preferences compiled for matching against many slots
+
+    Day specific prefs are stored in dicts keyed by prefix length and matched
+    as prefixes of the cleaned slot name. 'Any' day prefs are joined into a
+    single alternation regex and matched anywhere in the name. Each slot is
+    ranked by the earliest pref it matches.
+    """
+
+    def __init__(self, prefs):
+        self.prefs = prefs or []
+        self._prefixes = {}
+        any_ranks = []
+        any_patterns = []
+        for rank, pref in enumerate(self.prefs):
+            if pref.startswith('any'):
+                any_ranks.append(rank)
+                any_patterns.append(re.escape(pref.replace('any', '')))
+            else:
+                self._prefixes.setdefault(len(pref), {}).setdefault(pref, rank)
+        self._prefix_lengths = sorted(self._prefixes)
+        self._any_ranks = any_ranks
+        self._any_regex = None
+        if any_patterns:
+            alternation = '|'.join('({})'.format(p) for p in any_patterns)
+            self._any_regex = re.compile(alternation)
+            # Lookahead so that overlapping matches are found at every position
+            self._any_regex_all = re.compile('(?=(?:{}))'.format(alternation))
+
+    def __bool__(self):
+        return bool(self.prefs)
+
+    def rank(self, name):
+        """Return the rank of the first pref matching a cleaned slot name"""
+        best = None
+        for length in self._prefix_lengths:
+            rank = self._prefixes[length].get(name[:length])
+            if rank is not None and (best is None or rank < best):
+                best = rank
+        if self._any_regex and self._any_regex.search(name):
+            for match in self._any_regex_all.finditer(name):
+                rank = self._any_ranks[match.lastindex - 1]
+                if best is None or rank < best:
+                    best = rank
+        return best
+
+    def rank_indices(self, names):
+        """Return indices of matching slot names, ordered by pref rank"""
+        ranked = []
+        for index, name in enumerate(names):
+            rank = self.rank(clean_slotname(name))
+            if rank is not None:
+                ranked.append((rank, index))
+        return [index for _, index in sorted(ranked)]
+
+    def match(self, slots, names=None):
+        """Return matching slots without duplicates, ordered by pref rank"""
+        if names is None:
+            names = [s.full_name for s in slots]
+        return [slots[i] for i in self.rank_indices(names)]
@@ -0,0 +1,174 @@
+import json
+import logging
+import threading
+from contextlib import contextmanager
+from time import sleep, time
+
+try:
+    import fcntl
+except ImportError:
+    # No cross-process locking (Windows). Limits still apply per process
+    fcntl = None
+
+from config import RATE_LIMIT_PATH
+from .utils import conf_section
+
+log = logging.getLogger(__name__)
+
+_thread_lock = threading.Lock()
+
+
+class RateLimiter:
+    """
+    A token bucket shared by every process using the same state file, with
+    a circuit breaker for throttling
+
+    Each navigation (refresh, page load, waypoint click) takes a token.
+    Tokens refill at `rate` per minute up to `burst`, so a checkout can
+    click through several pages at once after a quiet period. The state
+    lives in a JSON file guarded by an exclusive `flock`, so monitors on
+    the same machine (and IP) share one budget.
+
+    When any process is throttled the breaker opens: nobody navigates for
+    `cooldown` seconds (doubling for repeated throttles within
+    `repeat_window`, up to `max_cooldown`) and the rate is multiplied by
+    `decrease`. Once it closes, the rate ramps back up by `increase` per
+    minute without a throttle, up to `max_rate`. This settles on the
+    highest rate that doesn't get throttled.
+    Settings are read from the `rate_limit` section of conf.toml
+    """
+    DEFAULTS = {
+        'max_rate': 12,
+        'min_rate': 1,
+        'burst': 6,
+        'decrease': 0.5,
+        'increase': 0.25,
+        'cooldown': 60,
+        'max_cooldown': 900,
+        'repeat_window': 1800,
+        # Longest single sleep, so throttles elsewhere are noticed promptly
+        'max_wait': 5
+    }
+
+    def __init__(self, path=RATE_LIMIT_PATH, conf=None, enabled=True):
+        self.path = path
+        self._conf = conf
+        self.enabled = enabled
+        self.breaker_open = False
+        self.acquired = 0
+        self.waited = 0
+
+    @property
+    def conf(self):
+        conf = dict(self.DEFAULTS)
+        conf.update(self._conf if self._conf is not None
+                    else conf_section('rate_limit'))
+        return conf
+
+    def initial_state(self, now, conf):
+        return {
+            'tokens': conf['burst'],
+            'rate': conf['max_rate'],
+            'updated': now,
+            'open_until': 0,
+            'last_trip': 0,
+            'trips': 0
+        }
+
+    @contextmanager
+    def state(self):
+        """Lock the state file and yield its contents, saving any changes"""
+        conf = self.conf
+        with _thread_lock, open(self.path, 'a+', encoding='utf-8') as f:
+            if fcntl:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                f.seek(0)
+                now = time()
+                try:
+                    state = json.loads(f.read())
+                except ValueError:
+                    state = self.initial_state(now, conf)
+                self.refill(state, now, conf)
+                yield state, now, conf
+                f.seek(0)
+                f.truncate()
+                f.write(json.dumps(state, sort_keys=True))
+                f.flush()
+            finally:
+                if fcntl:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+    @staticmethod
+    def refill(state, now, conf):
+        elapsed = max(0, now - max(state['updated'], state['open_until']))
+        state['updated'] = max(state['updated'], now)
+        if not elapsed:
+            return
+        state['tokens'] = min(conf['burst'],
+                              state['tokens'] + elapsed * state['rate'] / 60)
+        state['rate'] = min(conf['max_rate'],
+                            state['rate'] + elapsed * conf['increase'] / 60)
+
+    def acquire(self, reason='navigate'):
+        """Block until a token is available, then take it"""
+        if not self.enabled:
+            return 0
+        waited = 0
+        while True:
+            with self.state() as (state, now, conf):
+                if state['open_until'] > now:
+                    wait = state['open_until'] - now
+                    if not self.breaker_open:
+                        log.warning('Throttle breaker open for {:.0f}s'.format(
+                            wait
+                        ))
+                        self.breaker_open = True
+                elif state['tokens'] >= 1:
+                    state['tokens'] -= 1
+                    wait = 0
+                else:
+                    wait = (1 - state['tokens']) * 60 / state['rate']
+            if not wait:
+                break
+            wait = min(wait, conf['max_wait'])
+            log.debug('Waiting {:.1f}s for a rate limit token ({})'.format(
+                wait, reason
+            ))
+            sleep(wait)
+            waited += wait
+        if self.breaker_open:
+            log.info('Throttle breaker closed. Resuming at {:.1f} '
+                     'requests/min'.format(state['rate']))
+            self.breaker_open = False
+        self.acquired += 1
+        self.waited += waited
+        return waited
+
+    def trip(self):
+        """Open the breaker after a throttle, for every process"""
+        if not self.enabled:
+            return
+        with self.state() as (state, now, conf):
+            if state['open_until'] > now:
+                # Already tripped by this throttle (or by another process)
+                return
+            if now - state['last_trip'] < conf['repeat_window']:
+                state['trips'] += 1
+            else:
+                state['trips'] = 0
+            cooldown = min(conf['cooldown'] * 2 ** state['trips'],
+                           conf['max_cooldown'])
+            state['rate'] = max(conf['min_rate'],
+                                state['rate'] * conf['decrease'])
+            state['tokens'] = 0
+            state['last_trip'] = now
+            state['open_until'] = now + cooldown
+        log.warning('Throttled: pausing navigation for {:.0f}s, then '
+                    'resuming at {:.1f} requests/min'.format(
+                        cooldown, state['rate']
+                    ))
+
+    def __str__(self):
+        return 'navigations: {}, waited: {:.0f}s'.format(self.acquired,
+                                                         self.waited)
@@ -0,0 +1,106 @@
+import logging
+
+from config import Locators, SlotLocators
+from .elements import SlotElement, SlotElementMulti, DateElement, PaymentRow
+
+log = logging.getLogger(__name__)
+
+SLOT_CLASSES = {
+    cls.SLOT_TYPE: cls for cls in [SlotElement, SlotElementMulti]
+}
+
+
+class DateRecord:
+    """Plain date data with the same string interface as a DateElement"""
+
+    def __init__(self, texts, date_cls=DateElement, id=None):
+        self.texts = texts
+        self.sep = date_cls.STR_SEP
+        self.id = id
+
+    def __str__(self):
+        return self.sep.join(self.texts)
+
+    @property
+    def name(self):
+        return self.texts[0]
+
+
+class SlotRecord:
+    """
+    Plain slot data with the same string interface as a SlotElement
+
+    The live element is only looked up when the slot is selected
+    """
+
+    def __init__(self, driver, slot_type, window, date, price=None,
+                 delivery_type=None, id=None, index=None):
+        self.driver = driver
+        self.slot_type = slot_type
+        self.window = window
+        self.price = price
+        self.delivery_type = delivery_type
+        self.id = id
+        self.index = index
+        self._date_element = date
+        self._element = None
+
+    def __str__(self):
+        if self.slot_type == 'multi':
+            return SlotElementMulti.STR_SEP.join(
+                [self.delivery_type, self.window]
+            )
+        return SlotElement.STR_SEP.join(
+            [t for t in [self.window, self.price] if t is not None]
+        )
+
+    def __repr__(self):
+        return '<SlotRecord {}>'.format(self.full_name)
+
+    @property
+    def name(self):
+        if self.slot_type == 'multi':
+            return str(self)
+        return self.window
+
+    @property
+    def full_name(self):
+        return '::'.join([self._date_element.name, self.name])
+
+    @property
+    def element(self):
+        """Resolve the live slot element (and its date element)"""
+        if self._element is None:
+            if self.id:
+                log.debug("Resolving slot element by id: '{}'".format(self.id))
+                elem = self.driver.find_element_by_id(self.id)
+            else:
+                log.debug('Resolving slot element by index: {}'.format(
+                    self.index
+                ))
+                elem = self.driver.find_elements(
+                    *SlotLocators(self.slot_type).SLOT
+                )[self.index]
+            self._element = SLOT_CLASSES[self.slot_type](elem)
+        return self._element
+
+    def reset(self):
+        """Forget the resolved element, e.g. after the page is refreshed"""
+        self._element = None
+
+    def select(self, **kwargs):
+        self.element.select(**kwargs)
+
+
+class PaymentRecord:
+    """Plain payment row data, resolved to a PaymentRow only when selected"""
+
+    def __init__(self, driver, card_number, index):
+        self.driver = driver
+        self.card_number = card_number
+        self.index = index
+
+    def select(self, **kwargs):
+        PaymentRow(
+            self.driver.find_elements(*Locators.PAYMENT_ROW)[self.index]
+        ).select(**kwargs)
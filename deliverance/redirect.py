@@ -1,36 +1,65 @@
 import logging
-from time import sleep
-from datetime import datetime
-from selenium.common.exceptions import TimeoutException
+from selenium.common.exceptions import (NoSuchElementException,
+                                        StaleElementReferenceException,
+                                        TimeoutException)
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 
 from .exceptions import RouteRedirect, UnhandledRedirect, ItemOutOfStock
-from .utils import wait_for_element, click_when_enabled, dump_source
-from .notify import alert
+from .instrument import phase
+from .utils import (wait_for_element, click_when_enabled, dump_source,
+                    url_excludes)
 
 log = logging.getLogger(__name__)
 
+# Seconds between URL checks while waiting on the user. Each check is a
+# WebDriver round trip, and the user takes seconds anyway
+POLL_FREQUENCY = 1
+
+
+class logged_in:
+    """An expected condition for use with WebDriverWait"""
+
+    def __init__(self, browser):
+        self.browser = browser
+
+    def __call__(self, driver):
+        return self.browser.is_logged_in(driver.current_url, wait=False)
+
+
+def wait_for_url_change(browser, pattern, timeout_mins):
+    """Wait until the current URL no longer contains `pattern`"""
+    try:
+        WebDriverWait(browser.driver, timeout_mins*60,
+                      poll_frequency=POLL_FREQUENCY).until(
+            url_excludes(pattern)
+        )
+        return True
+    except TimeoutException:
+        return False
+
 
 def wait_for_auth(browser, timeout_mins=10):
-    t = datetime.now()
-    alerted = []
     if browser.is_logged_in():
         log.debug('Already logged in')
         return
     log.info('Waiting for user login...')
-    while not browser.is_logged_in():
-        elapsed = int((datetime.now() - t).total_seconds() / 60)
-        if browser.is_logged_in():
+    condition = logged_in(browser)
+    for _ in range(timeout_mins):
+        browser.notifier.alert('Log in to proceed')
+        try:
+            WebDriverWait(
+                browser.driver, 60, poll_frequency=POLL_FREQUENCY,
+                ignored_exceptions=[NoSuchElementException,
+                                    StaleElementReferenceException]
+            ).until(condition)
             break
-        elif elapsed > timeout_mins:
-            raise RuntimeError(
-                'Timed out waiting for login (>= {}min)'.format(timeout_mins)
-            )
-        elif elapsed not in alerted:
-            alerted.append(elapsed)
-            alert('Log in to proceed')
-        sleep(1)
+        except TimeoutException:
+            pass
+    else:
+        raise RuntimeError(
+            'Timed out waiting for login (>= {}min)'.format(timeout_mins)
+        )
     log.info('Logged in')
 
 
@@ -41,60 +70,62 @@ def handle_oos(browser, timeout_mins=10):
         log.error('Could not save removed items')
     if browser.args.ignore_oos:
         log.warning('Attempting to proceed through OOS alert')
+        browser.limiter.acquire('click')
         click_when_enabled(
             browser.driver,
             wait_for_element(browser.driver, browser.Locators.OOS_CONTINUE)
         )
     else:
-        t = datetime.now()
-        alert(
+        browser.notifier.alert(
             "An item is out of stock. Press continue if you'd like to proceed",
             'Sosumi'
         )
-        while browser.Patterns.OOS_URL in browser.current_url:
-            if int((datetime.now() - t).total_seconds()) > timeout_mins*60:
-                raise ItemOutOfStock(
-                    'Encountered OOS alert and timed out waiting for user '
-                    'input\n Use `ignore-oos` to bypass these alerts'
-                )
-            sleep(1)
+        if not wait_for_url_change(browser, browser.Patterns.OOS_URL,
+                                   timeout_mins):
+            raise ItemOutOfStock(
+                'Encountered OOS alert and timed out waiting for user '
+                'input\n Use `ignore-oos` to bypass these alerts'
+            )
 
 
 def handle_throttle(browser, timeout_mins=10):
-    alert('Throttled', 'Sosumi')
+    browser.scheduler.record_throttle()
+    browser.limiter.trip()
+    browser.notifier.alert('Throttled', 'Sosumi')
     # Dump source until we're sure we have correct locator for continue button
     dump_source(browser.driver)
     try:
-        click_when_enabled(
-            browser.driver,
-            wait_for_element(browser.driver,
-                             browser.Locators.THROTTLE_CONTINUE),
-            timeout=60
-        )
+        continue_button = wait_for_element(browser.driver,
+                                           browser.Locators.THROTTLE_CONTINUE)
+        # Waits out the cooldown before clicking through
+        browser.limiter.acquire('click')
+        click_when_enabled(browser.driver, continue_button, timeout=60)
     except Exception as e:
         log.error(e)
-    t = datetime.now()
-    while browser.Patterns.THROTTLE_URL in browser.current_url:
-        if int((datetime.now() - t).total_seconds()) > timeout_mins*60:
-            raise UnhandledRedirect(
-                'Throttled and timed out waiting for user input'
-            )
-        sleep(1)
+    if not wait_for_url_change(browser, browser.Patterns.THROTTLE_URL,
+                               timeout_mins):
+        raise UnhandledRedirect(
+            'Throttled and timed out waiting for user input'
+        )
 
 
+@phase('handle_redirect')
 def handle_redirect(browser, valid_dest=None, timeout=None, route=None):
     current = browser.current_url
     log.warning("Redirected to: '{}'".format(current))
 
-    if browser.Patterns.AUTH_URL in current:
+    kind = browser.router.classify(current).kind
+    if kind == 'auth':
+        browser.login.invalidate()
         wait_for_auth(browser)
-    elif browser.Patterns.OOS_URL in current:
+    elif kind == 'oos':
         handle_oos(browser)
-    elif browser.Patterns.THROTTLE_URL in current:
+    elif kind == 'throttle':
         handle_throttle(browser)
         raise RouteRedirect('Redirected after throttle')
     elif route and current == route.route_start:
         if not route.waypoints_reached:
+            browser.limiter.acquire('refresh')
             browser.driver.refresh()
         raise RouteRedirect()
     elif valid_dest and timeout:
@@ -0,0 +1,245 @@
+import gzip
+import hashlib
+import json
+import logging
+import zlib
+from collections import Counter
+from datetime import datetime
+from time import perf_counter
+
+from selenium.common.exceptions import WebDriverException
+
+from config import Locators, SlotLocators
+from .metrics import LatencyStats
+from .parse import PageSnapshot
+from .records import SLOT_CLASSES
+from .utils import locator_xpath
+
+log = logging.getLogger(__name__)
+
+# Returns the outer HTML of every node matching the XPATHs in arguments[0],
+# skipping nodes inside one already captured
+CAPTURE_JS = """
+var xpaths = arguments[0], nodes = [];
+for (var i = 0; i < xpaths.length; i++) {
+  var result = document.evaluate(xpaths[i], document, null,
+                                 XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+  for (var j = 0; j < result.snapshotLength; j++) {
+    var node = result.snapshotItem(j);
+    if (!nodes.some(function (n) { return n.contains(node); })) {
+      nodes.push(node);
+    }
+  }
+}
+return {url: location.href,
+        html: nodes.map(function (n) { return n.outerHTML; })};
+"""
+
+
+def capture_xpaths():
+    """
+    The parts of a page that parsing depends on, outermost first: slot
+    date ancestors and containers, date buttons, payment, cart and OOS rows
+    """
+    xpaths = []
+    for slot_type, slot_cls in SLOT_CLASSES.items():
+        if slot_cls.DATE_ANCESTOR:
+            xpaths.append('//' + slot_cls.DATE_ANCESTOR)
+        xpaths.append(locator_xpath(SlotLocators(slot_type).CONTAINER))
+    for slot_cls in SLOT_CLASSES.values():
+        xpaths.append(slot_cls.DATE_INDEX_XPATH)
+    # The cart row XPATH starts at the rows' parent, so keep that
+    cart_list = locator_xpath(Locators.CART_ITEMS).rsplit('/', 1)[0]
+    xpaths.extend([locator_xpath(Locators.PAYMENT_ROW), cart_list,
+                   locator_xpath(Locators.OOS_ITEM)])
+    return xpaths
+
+
+class SnapshotRecorder:
+    """
+    Appends page snapshots to a gzip compressed JSON lines archive
+
+    Each record holds the time, service, kind ('slots', 'cart' or
+    'payment'), URL and a hash of the captured HTML. The HTML itself is
+    only stored when it differs from the previous snapshot of the same kind,
+    so an unchanged slot page costs a few bytes. Every write is a separate
+    gzip member, so the archive stays readable if the process is killed
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.xpaths = capture_xpaths()
+        self.last_hash = {}
+        self.recorded = 0
+
+    def record(self, driver, kind, service):
+        try:
+            capture = driver.execute_script(CAPTURE_JS, self.xpaths)
+        except WebDriverException:
+            log.warning('Failed to capture a {} snapshot'.format(kind))
+            return
+        source = '<html><body>\n{}\n</body></html>'.format(
+            '\n'.join(capture['html'])
+        )
+        digest = hashlib.sha1(source.encode('utf-8')).hexdigest()
+        record = {
+            'time': datetime.now().isoformat(timespec='milliseconds'),
+            'service': service,
+            'kind': kind,
+            'url': capture['url'],
+            'hash': digest
+        }
+        if self.last_hash.get(kind) != digest:
+            record['html'] = source
+            self.last_hash[kind] = digest
+        with gzip.open(self.path, 'at', encoding='utf-8') as f:
+            f.write(json.dumps(record) + '\n')
+        self.recorded += 1
+
+
+def iter_snapshots(path):
+    """
+    Yield the records of an archive, filling in the HTML of snapshots that
+    repeat the previous one. Stops quietly at a truncated final write
+    """
+    last_html = {}
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        try:
+            for line in f:
+                record = json.loads(line)
+                kind = record['kind']
+                if 'html' in record:
+                    last_html[kind] = record['html']
+                elif kind in last_html:
+                    record['html'] = last_html[kind]
+                else:
+                    # First snapshot of this kind was lost
+                    continue
+                yield record
+        except (EOFError, zlib.error, ValueError):
+            log.warning("Archive '{}' ends with a truncated record".format(
+                path
+            ))
+
+
+class ReplayDriver:
+    """
+    Serves archived snapshots to a Browser in place of a WebDriver
+
+    Supports what reading slots with `extract='lxml'` needs: the current
+    URL, the page source and finding elements (as lxml nodes)
+    """
+
+    def __init__(self):
+        self.current_url = ''
+        self.page_source = '<html><body></body></html>'
+        self.tree = None
+
+    def load(self, url, source):
+        self.current_url = url
+        self.page_source = source
+        self.tree = None
+
+    def find_elements(self, by, value):
+        if self.tree is None:
+            self.tree = PageSnapshot(self.page_source, self.current_url).tree
+        return self.tree.xpath(locator_xpath((by, value)))
+
+    def execute_script(self, script, *args):
+        raise WebDriverException('Scripts are not available in replay')
+
+    def get_cookies(self):
+        return []
+
+
+class Replayer:
+    """
+    Feeds archived snapshots through the same parsing, slot preference
+    matching and message generation as a live run, as fast as they parse
+
+    browser: A Browser built on a ReplayDriver
+    """
+
+    def __init__(self, browser):
+        self.browser = browser
+        self.driver = browser.driver
+        self.latency = {kind: LatencyStats()
+                        for kind in ['slots', 'cart', 'payment']}
+        self.counts = Counter()
+        self.failures = []
+
+    def replay_slots(self, record):
+        browser = self.browser
+        slot_page = browser.routes['SLOT_SELECT'].waypoints[-1]
+        if not slot_page.check_current(browser.current_url):
+            self.counts['skipped'] += 1
+            return
+        # Snapshots may come from several runs, on different slot pages
+        browser.slot_type = None
+        slots = browser.get_slots()
+        self.counts['slot_pages'] += 1
+        if slots:
+            self.counts['with_slots'] += 1
+            log.info('[{}] {}'.format(record['time'],
+                                      browser.generate_message(slots)))
+
+    def replay_record(self, record):
+        browser = self.browser
+        if record['service'] != browser.site_config.service:
+            browser.set_service(record['service'])
+        self.driver.load(record['url'], record['html'])
+        kind = record['kind']
+        t = perf_counter()
+        try:
+            if kind == 'slots':
+                self.replay_slots(record)
+            elif kind == 'cart':
+                items = PageSnapshot.from_driver(self.driver).cart_items()
+                self.counts['cart_items'] += len(items)
+            elif kind == 'payment':
+                rows = PageSnapshot.from_driver(self.driver).payment_rows()
+                self.counts['payment_rows'] += len(rows)
+        except Exception as e:
+            self.counts['failed'] += 1
+            self.failures.append((record['time'], kind, repr(e)))
+            log.error('[{}] Replaying {} snapshot failed: {!r}'.format(
+                record['time'], kind, e
+            ))
+        else:
+            self.latency[kind].add(perf_counter() - t)
+        self.counts['snapshots'] += 1
+
+    def run(self, path):
+        t = perf_counter()
+        for record in iter_snapshots(path):
+            self.replay_record(record)
+        elapsed = perf_counter() - t
+        self.report(elapsed)
+        return self.failures
+
+    def report(self, elapsed):
+        snapshots = self.counts['snapshots']
+        log.info('Replayed {} snapshots in {:.2f}s ({:.0f}/s)'.format(
+            snapshots, elapsed, snapshots / elapsed if elapsed else 0
+        ))
+        log.info('Counts: {}'.format(dict(self.counts)))
+        for kind, stats in self.latency.items():
+            if stats.count:
+                log.info('{} snapshot latency: {}'.format(kind, stats))
+
+
+def replay(path, args):
+    """Replay an archive recorded with --record. Returns the failures"""
+    from . import Browser
+
+    # Parse locally and leave everything else alone
+    args.extract = 'lxml'
+    args.fingerprint = False
+    args.http_poll = False
+    args.history = None
+    args.shortcuts = False
+    args.save_cart = False
+    args.record = None
+    browser = Browser(ReplayDriver(), args)
+    browser.notifier.close()
+    return Replayer(browser).run(path)
@@ -0,0 +1,58 @@
+import re
+import logging
+from collections import namedtuple
+
+from .utils import remove_qs
+
+log = logging.getLogger(__name__)
+
+# kind: 'auth', 'oos', 'throttle', 'waypoint' or None (unknown URL)
+# dest: the matched waypoint dest, if kind is 'waypoint'
+# positions: {route name: waypoint index} of the routes with that dest
+URLState = namedtuple('URLState', ['kind', 'dest', 'positions'])
+
+UNKNOWN = URLState(None, None, {})
+
+
+class Router:
+    """
+    Classifies URLs against the redirect patterns and every route waypoint
+    with one compiled regex
+
+    Patterns are tried in priority order (redirects first, then waypoints in
+    route order) regardless of where they occur in the URL, matching the
+    substring checks of Waypoint.check_current
+    """
+
+    def __init__(self, patterns, routes):
+        self.states = [
+            URLState('auth', None, {}),
+            URLState('oos', None, {}),
+            URLState('throttle', None, {}),
+        ]
+        needles = [patterns.AUTH_URL, patterns.OOS_URL, patterns.THROTTLE_URL]
+        positions = {}
+        for route_name, route in routes.items():
+            for i, waypoint in enumerate(route.waypoints):
+                for dest in waypoint.dest:
+                    if dest not in positions:
+                        positions[dest] = {}
+                        needles.append(dest)
+                    positions[dest].setdefault(route_name, i)
+        for dest in needles[len(self.states):]:
+            self.states.append(URLState('waypoint', dest, positions[dest]))
+        self.pattern = re.compile('^(?:{})'.format('|'.join(
+            '(?=.*?(?P<s{}>{}))'.format(i, re.escape(needle))
+            for i, needle in enumerate(needles)
+        )))
+        log.debug('Compiled router for {} URL patterns'.format(len(needles)))
+
+    def classify(self, url):
+        match = self.pattern.match(remove_qs(url))
+        if not match:
+            return UNKNOWN
+        return self.states[int(match.lastgroup[1:])]
+
+    def position(self, route, url):
+        """Index of the waypoint of `route` whose dest `url` is, or None"""
+        return self.classify(url).positions.get(route.name)
@@ -0,0 +1,119 @@
+import logging
+from collections import deque
+from datetime import datetime, timedelta
+
+from config import INTERVAL
+from .utils import conf_section, jittered
+
+log = logging.getLogger(__name__)
+
+MINUTES_PER_DAY = 24 * 60
+
+
+def minute_of_day(when):
+    return when.hour * 60 + when.minute
+
+
+def parse_clock(value):
+    """Convert a 'HH:MM' string to minutes after midnight"""
+    hours, minutes = value.split(':')
+    return int(hours) * 60 + int(minutes)
+
+
+class PollScheduler:
+    """
+    Chooses the delay before the next slot page refresh
+
+    Starts from the base interval and adjusts it for:
+     - throttling: each throttle multiplies the delay by `throttle_backoff`,
+       decaying by `throttle_decay` levels per clean poll
+     - release times: polls faster within `release_window` minutes of a
+       time of day at which slots were seen appearing at least
+       `release_min_count` times before (or listed in `release_times`)
+     - quiet hours: polls slower during the listed hours of the day
+     - budget: never polls faster than the base interval once
+       `max_polls_per_hour` polls have been made in the last hour
+    The result is randomized and clamped to [min_interval, max_interval].
+    Settings are read from the `polling` section of conf.toml
+    """
+    DEFAULTS = {
+        'interval': INTERVAL,
+        'min_interval': 8,
+        'max_interval': 180,
+        'throttle_backoff': 2.0,
+        'throttle_decay': 0.02,
+        'release_times': [],
+        'release_window': 5,
+        'release_min_count': 2,
+        'release_factor': 0.5,
+        'quiet_hours': [],
+        'quiet_factor': 2.0,
+        'max_polls_per_hour': 160
+    }
+
+    def __init__(self, conf=None, randomize=True, history=500):
+        self._conf = conf
+        self.randomize = randomize
+        self.throttle_level = 0
+        self.releases = deque(maxlen=history)
+        self.polls = deque()
+        self.last_found = False
+
+    @property
+    def conf(self):
+        conf = dict(self.DEFAULTS)
+        conf.update(self._conf if self._conf is not None
+                    else conf_section('polling'))
+        return conf
+
+    def record_throttle(self):
+        self.throttle_level += 1
+        log.warning('Throttle recorded. Backoff level: {:.1f}'.format(
+            self.throttle_level
+        ))
+
+    def record_release(self, when=None):
+        self.releases.append(minute_of_day(when or datetime.now()))
+
+    def record_poll(self, found, when=None):
+        """Record the outcome of a poll. Slots appearing count as a release"""
+        when = when or datetime.now()
+        self.polls.append(when)
+        while self.polls[0] < when - timedelta(hours=1):
+            self.polls.popleft()
+        self.throttle_level = max(
+            0, self.throttle_level - self.conf['throttle_decay']
+        )
+        if found and not self.last_found:
+            self.record_release(when)
+        self.last_found = found
+
+    def near_release(self, now, conf):
+        minute = minute_of_day(now)
+        window = conf['release_window']
+
+        def near(release):
+            distance = abs(minute - release)
+            return min(distance, MINUTES_PER_DAY - distance) <= window
+
+        if any(near(parse_clock(t)) for t in conf['release_times']):
+            return True
+        hits = sum(near(release) for release in self.releases)
+        return hits >= conf['release_min_count']
+
+    def next_interval(self, now=None):
+        now = now or datetime.now()
+        conf = self.conf
+        interval = conf['interval']
+        over_budget = len(self.polls) >= conf['max_polls_per_hour']
+        if self.near_release(now, conf) and not over_budget:
+            interval *= conf['release_factor']
+        elif now.hour in conf['quiet_hours']:
+            interval *= conf['quiet_factor']
+        interval *= conf['throttle_backoff'] ** self.throttle_level
+        if self.randomize:
+            interval = jittered(interval)
+        interval = min(max(interval, conf['min_interval']),
+                       conf['max_interval'])
+        log.debug('Next poll in {:.1f}s'.format(interval))
+        return interval
@@ -0,0 +1,68 @@
+import json
+import logging
+import os
+
+log = logging.getLogger(__name__)
+
+
+class ShortcutStore:
+    """
+    Remembers, per service and route, whether loading a route's final URL
+    directly works
+
+    A shortcut is skipped after `max_failures` consecutive failures and
+    tried again once it has been skipped `retry_after` times, since a
+    failure may only mean the cart was empty at the time. State is saved to
+    a JSON file whenever it changes
+    """
+
+    def __init__(self, path, max_failures=2, retry_after=20):
+        self.path = path
+        self.max_failures = max_failures
+        self.retry_after = retry_after
+        self.state = {}
+        try:
+            with open(path, encoding='utf-8') as f:
+                self.state = json.load(f)
+        except FileNotFoundError:
+            pass
+        except Exception:
+            log.warning("Couldn't read route shortcuts from '{}'".format(
+                path
+            ))
+
+    def entry(self, service, route_name):
+        return self.state.setdefault(service, {}).setdefault(
+            route_name, {'ok': 0, 'failed': 0, 'skipped': 0}
+        )
+
+    def should_try(self, service, route_name):
+        entry = self.entry(service, route_name)
+        if entry['failed'] < self.max_failures:
+            return True
+        entry['skipped'] += 1
+        if entry['skipped'] >= self.retry_after:
+            entry['skipped'] = 0
+            return True
+        return False
+
+    def record(self, service, route_name, url, ok):
+        entry = self.entry(service, route_name)
+        entry['url'] = url
+        if ok:
+            entry['ok'] += 1
+            entry['failed'] = 0
+        else:
+            entry['failed'] += 1
+        self.save()
+
+    def save(self):
+        tmp = self.path + '.tmp'
+        try:
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(self.state, f, indent=2, sort_keys=True)
+            os.replace(tmp, self.path)
+        except OSError:
+            log.warning("Couldn't save route shortcuts to '{}'".format(
+                self.path
+            ))
@@ -0,0 +1,279 @@
+import argparse
+import logging
+import multiprocessing
+import os
+import signal
+from collections import namedtuple
+from logging.handlers import QueueHandler, QueueListener
+from time import monotonic, sleep
+
+import toml
+
+from .chrome import descendants, process_tree_rss
+
+log = logging.getLogger(__name__)
+
+# name: Worker process name, shown in the event stream
+# profile: Chrome user data dir, also holding the job's route shortcuts and
+#          cart history. Each job needs its own
+# conf: Config file for the job (notifications, slot preferences, ...)
+# args: Extra run.py arguments, e.g. ['--lean', '--checkout']
+Job = namedtuple('Job', ['name', 'service', 'profile', 'conf', 'args'])
+
+DEFAULT_LIMITS = {
+    'memory_mb': 0,      # Restart a worker whose process tree exceeds this
+    'nice': 5,           # Added to each worker's niceness
+    'pin_cpus': True,    # Pin each worker (and its Chrome) to one core
+    'restart_delay': 5,  # Seconds, doubled after each quick crash
+    'max_restart_delay': 300,
+    'stable_after': 600  # Seconds a worker must run to reset the delay
+}
+
+
+def load_jobs(path):
+    """Read jobs and limits from a TOML file like jobs_template.toml"""
+    data = toml.load(path)
+    limits = dict(DEFAULT_LIMITS)
+    limits.update(data.get('limits', {}))
+    jobs = []
+    for i, job in enumerate(data.get('job', [])):
+        jobs.append(Job(
+            job.get('name', 'job{}'.format(i)),
+            job['service'],
+            job['profile'],
+            job.get('conf', 'conf.toml'),
+            job.get('args', [])
+        ))
+    profiles = [job.profile for job in jobs]
+    if len(set(profiles)) != len(profiles):
+        raise ValueError('Each job needs its own Chrome profile directory')
+    names = [job.name for job in jobs]
+    if len(set(names)) != len(names):
+        raise ValueError('Job names must be unique')
+    return jobs, limits
+
+
+def worker_args(parser, args, job):
+    """
+    Parse a job's options: the supervisor's own command line options (e.g.
+    --debug, --no-rate-limit), overlaid with the job's service and `args`
+    """
+    namespace = argparse.Namespace(**vars(args))
+    namespace.jobs = None
+    return parser.parse_args(['--service', job.service] + job.args,
+                             namespace=namespace)
+
+
+def start_driver(args, started=None):
+    """
+    Launch (or attach to) Chrome. Returns the driver and a StartupTimer
+
+    started: `perf_counter()` at process start, for the time to first poll
+    """
+    # Imported here so worker processes read config after their environment
+    # has been set up
+    from . import instrument
+    from .chrome import build_driver
+    from .metrics import StartupTimer
+    from .notify import warm_up
+
+    startup = StartupTimer(started)
+    if not args.no_import:
+        # Import appends ./env/lib/.../chromedriver to $PATH
+        import chromedriver_binary  # noqa: F401
+    startup.mark('imports')
+
+    warm_up()
+    driver = build_driver(args)
+    startup.mark('attach' if args.attach else 'launch')
+    if args.instrument:
+        instrument.enable(driver, args.instrument)
+    return driver, startup
+
+
+def run_browser(args, hold_minutes=15, started=None):
+    """Start Chrome and watch for slots until main_loop returns"""
+    from selenium.common.exceptions import WebDriverException
+    from . import Browser
+    from .notify import alert
+    from .utils import dump_source
+
+    driver, startup = start_driver(args, started)
+    try:
+        try:
+            Browser(driver, args, startup).main_loop()
+        except WebDriverException:
+            alert('Encountered an error', 'Basso')
+            if args.debug:
+                dump_source(driver)
+            raise
+        if args.attach:
+            # The browser stays open for a manual checkout
+            return
+        try:
+            # allow time to check out manually
+            log.info('Sleeping for {} minutes (press Ctrl+C to close)'.format(
+                hold_minutes
+            ))
+            sleep(hold_minutes*60)
+        except KeyboardInterrupt:
+            log.warning('Slumber disturbed')
+    finally:
+        # Also on SIGTERM (see worker_main), so Chrome doesn't outlive us
+        # and keep its profile locked
+        log.info('Detaching from Chrome' if args.attach
+                 else 'Closing webdriver')
+        driver.quit()
+
+
+def _terminated(signum, frame):
+    raise SystemExit(128 + signum)
+
+
+def worker_main(args, log_queue, limits, cpu):
+    """Entry point of a worker process"""
+    root = logging.getLogger()
+    root.handlers = [QueueHandler(log_queue)]
+    root.setLevel(logging.DEBUG if args.debug else logging.INFO)
+    if limits['nice']:
+        os.nice(limits['nice'])
+    if cpu is not None and hasattr(os, 'sched_setaffinity'):
+        # Inherited by chromedriver and Chrome
+        os.sched_setaffinity(0, {cpu})
+    # Unwind on Supervisor.stop, quitting the driver on the way out
+    signal.signal(signal.SIGTERM, _terminated)
+    run_browser(args)
+
+
+class Worker:
+    def __init__(self, job, args):
+        self.job = job
+        self.args = args
+        self.process = None
+        self.started = None
+        self.restarts = 0
+        self.delay = None
+        self.restart_at = None
+        self.done = False
+
+
+class Supervisor:
+    """
+    Runs each job's Browser in its own process, with its own chromedriver
+
+    Worker logs are merged into this process's log handlers, tagged with
+    the job name. Crashed workers (non-zero exit) are restarted after a
+    delay that doubles while they keep crashing quickly. A worker that
+    exits cleanly (slots found, or checked out) is not restarted
+    """
+
+    def __init__(self, workers, limits, poll_interval=2):
+        self.ctx = multiprocessing.get_context('spawn')
+        self.workers = workers
+        self.limits = limits
+        self.poll_interval = poll_interval
+        self.log_queue = self.ctx.Queue()
+
+    def start(self, index, worker):
+        job = worker.job
+        cpu = None
+        if self.limits['pin_cpus'] and hasattr(os, 'sched_getaffinity'):
+            cpus = sorted(os.sched_getaffinity(0))
+            cpu = cpus[index % len(cpus)]
+        # Route shortcuts and cart history belong to the job's account, so
+        # they are kept next to its Chrome profile
+        os.makedirs(job.profile, exist_ok=True)
+        env = {'DELIVERANCE_CONF': job.conf,
+               'DELIVERANCE_PROFILE': job.profile,
+               'DELIVERANCE_STATE_DIR': job.profile}
+        saved = {k: os.environ.get(k) for k in env}
+        # Spawned workers copy the environment when started
+        os.environ.update(env)
+        try:
+            worker.process = self.ctx.Process(
+                target=worker_main, name=job.name,
+                args=(worker.args, self.log_queue, self.limits, cpu)
+            )
+            worker.process.start()
+        finally:
+            for k, v in saved.items():
+                if v is None:
+                    os.environ.pop(k, None)
+                else:
+                    os.environ[k] = v
+        worker.started = monotonic()
+        worker.restart_at = None
+        log.info("Started '{}' ({}, profile '{}', pid {}{})".format(
+            job.name, job.service, job.profile, worker.process.pid,
+            ', cpu {}'.format(cpu) if cpu is not None else ''
+        ))
+
+    def check(self, index, worker):
+        now = monotonic()
+        if worker.restart_at is not None:
+            if now >= worker.restart_at:
+                worker.restarts += 1
+                self.start(index, worker)
+            return
+        process = worker.process
+        if process.is_alive():
+            limit = self.limits['memory_mb']
+            rss = process_tree_rss(process.pid) if limit else None
+            if rss and rss > limit * 2**20:
+                log.error("'{}' is using {:.0f}MB (limit {}MB). "
+                          "Restarting".format(worker.job.name, rss / 2**20,
+                                              limit))
+                self.stop(worker)
+            return
+        if process.exitcode == 0:
+            log.info("'{}' finished".format(worker.job.name))
+            worker.done = True
+            return
+        ran = now - worker.started
+        if worker.delay is None or ran >= self.limits['stable_after']:
+            worker.delay = self.limits['restart_delay']
+        else:
+            worker.delay = min(worker.delay * 2,
+                               self.limits['max_restart_delay'])
+        worker.restart_at = now + worker.delay
+        log.error("'{}' exited with code {} after {:.0f}s. Restarting in "
+                  "{}s".format(worker.job.name, process.exitcode, ran,
+                               worker.delay))
+
+    def stop(self, worker, timeout=10):
+        process = worker.process
+        if process is None or not process.is_alive():
+            return
+        children = descendants(process.pid)
+        process.terminate()
+        process.join(timeout)
+        if process.is_alive():
+            process.kill()
+            process.join()
+        # Whatever the worker couldn't shut down (e.g. after kill())
+        for pid in children:
+            try:
+                os.kill(pid, getattr(signal, 'SIGKILL', signal.SIGTERM))
+            except OSError:
+                pass
+
+    def run(self):
+        listener = QueueListener(self.log_queue,
+                                 *logging.getLogger().handlers,
+                                 respect_handler_level=True)
+        listener.start()
+        try:
+            for index, worker in enumerate(self.workers):
+                self.start(index, worker)
+            while not all(w.done for w in self.workers):
+                sleep(self.poll_interval)
+                for index, worker in enumerate(self.workers):
+                    if not worker.done:
+                        self.check(index, worker)
+            log.info('All jobs finished')
+        except KeyboardInterrupt:
+            log.warning('Stopping workers')
+        finally:
+            for worker in self.workers:
+                self.stop(worker)
+            listener.stop()
@@ -5,11 +5,12 @@ from time import sleep
 from functools import wraps
 from datetime import datetime
 from urllib.parse import urlparse
+from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.common.exceptions import (ElementClickInterceptedException,
                                         TimeoutException)
 
-from config import CONF_PATH
+from config import CONF_PATH, conf_cache
 
 log = logging.getLogger(__name__)
 
@@ -20,7 +21,7 @@ def conf_dependent(conf_key):
         def wrapper(*args, **kwargs):
             if 'conf' not in kwargs:
                 try:
-                    kwargs['conf'] = toml.load(CONF_PATH)[conf_key]
+                    kwargs['conf'] = conf_cache.load()[conf_key]
                 except Exception:
                     log.error("{}() requires a config file at"
                               " '{}' with key '{}'".format(func.__name__,
@@ -36,15 +37,58 @@ def conf_dependent(conf_key):
     return decorator
 
 
+def is_configured(conf_key, required=('token',)):
+    """Check the config file has a section with non-empty required keys"""
+    try:
+        conf = conf_cache.load()[conf_key]
+    except Exception:
+        return False
+    return all(conf.get(k) for k in required)
+
+
+def conf_section(conf_key):
+    """Return a config section, or an empty dict if it isn't available"""
+    try:
+        return conf_cache.load().get(conf_key, {})
+    except Exception:
+        return {}
+
+
+def locator_xpath(locator):
+    """Translate a Selenium locator tuple into an equivalent XPATH"""
+    by, value = locator
+    if by == By.XPATH:
+        return value
+    elif by == By.ID:
+        return "//*[@id='{}']".format(value)
+    elif by == By.CLASS_NAME:
+        return ("//*[contains(concat(' ', normalize-space(@class), ' '), "
+                "' {} ')]".format(value))
+    raise ValueError("Unsupported locator strategy '{}'".format(by))
+
+
+def xpath_literal(text):
+    """Quote `text` as an XPATH string literal, whatever quotes it holds"""
+    if "'" not in text:
+        return "'{}'".format(text)
+    if '"' not in text:
+        return '"{}"'.format(text)
+    return "concat('{}')".format("', \"'\", '".join(text.split("'")))
+
+
 def remove_qs(url):
     """Remove URL query string the lazy way"""
     return url.split('?')[0]
 
 
+def jittered(seconds):
+    pct = abs(random.gauss(.2, .05))
+    return random.uniform(seconds*(1-pct), seconds*(1+pct))
+
+
 def jitter(seconds):
     """This seems unnecessary"""
-    pct = abs(random.gauss(.2, .05))
-    sleep(random.uniform(seconds*(1-pct), seconds*(1+pct)))
+    sleep(jittered(seconds))
 
 
 def timestamp():
@@ -100,6 +144,16 @@ class presence_of_any_elements_located(object):
         return False
 
 
+class url_excludes:
+    """An expected condition for use with WebDriverWait"""
+
+    def __init__(self, pattern):
+        self.pattern = pattern
+
+    def __call__(self, driver):
+        return self.pattern not in remove_qs(driver.current_url)
+
+
 def wait_for_elements(driver, locators, timeout=5):
     if not isinstance(locators, list):
         locators = [locators]
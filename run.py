@@ -1,14 +1,17 @@
+from time import perf_counter
+# Before the imports below, so their cost counts towards time to first poll
+STARTED = perf_counter()
+
 import argparse
+import json
 import logging
-from time import sleep
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from selenium.common.exceptions import WebDriverException
 
 import config
-from deliverance.notify import alert
-from deliverance.utils import dump_source
-from deliverance import Browser
+from deliverance.history import report
+from deliverance.replay import replay
+from deliverance.daemon import command_params, run_daemon, send_command
+from deliverance.supervisor import (Supervisor, Worker, load_jobs,
+                                    run_browser, worker_args)
 
 log = logging.getLogger(__name__)
 
@@ -23,9 +26,77 @@ parser.add_argument('--ignore-oos', action='store_true',
                          "save removed item details to a local TOML file")
 parser.add_argument('--save-cart', action='store_true',
                     help="Saves your cart information to a local TOML file")
+parser.add_argument('--extract', choices=['element', 'script', 'lxml'],
+                    default='element',
+                    help="How page data is read. 'script' collects all "
+                         "slots in a single WebDriver call, 'lxml' parses "
+                         "slots, cart, OOS and payment rows from the page "
+                         "source")
+parser.add_argument('--no-fingerprint', dest='fingerprint',
+                    action='store_false',
+                    help="Parse the slot page on every refresh, even when "
+                         "the available slots haven't changed")
+parser.add_argument('--http-poll', action='store_true',
+                    help="Poll the slot page over HTTP with the browser's "
+                         "cookies. The browser is only used for checkout "
+                         "and when HTTP polling fails")
+parser.add_argument('--shortcut', dest='shortcuts', action='store_true',
+                    help="Load the slot select page directly when that has "
+                         "worked before, instead of clicking through the "
+                         "cart")
+parser.add_argument('--no-rate-limit', dest='rate_limit',
+                    action='store_false',
+                    help="Don't pace navigation with the rate limiter shared "
+                         "by all processes started from this directory")
+parser.add_argument('--attach', metavar='HOST:PORT',
+                    help="Attach to a Chrome already running with "
+                         "--remote-debugging-port, reusing its session "
+                         "instead of launching a new browser")
 parser.add_argument('--no-import', action='store_true',
                     help="Don't import chromedriver_binary. Set this flag "
                          "if using an existing chromedriver in $PATH")
+parser.add_argument('--lean', action='store_true',
+                    help="Run Chrome headless with the 'eager' page load "
+                         "strategy, blocking images, media and trackers. "
+                         "Requires a profile that is already logged in")
+parser.add_argument('--history', nargs='?', const='slot_history.db',
+                    metavar='PATH',
+                    help="Log every slot observation to a SQLite database "
+                         "(default: slot_history.db)")
+parser.add_argument('--history-report', choices=['releases', 'lifetime'],
+                    help="Print slot release times by hour or slot "
+                         "lifetimes from the --history database and exit")
+parser.add_argument('--record', nargs='?', const='snapshots.jsonl.gz',
+                    metavar='PATH',
+                    help="Append the slot, cart and payment parts of every "
+                         "page read to a compressed archive (default: "
+                         "snapshots.jsonl.gz)")
+parser.add_argument('--replay', metavar='PATH',
+                    help="Run the snapshots in a --record archive through "
+                         "slot parsing, preference matching and message "
+                         "generation without a browser, then exit")
+parser.add_argument('--instrument', nargs='?', type=float, const=300,
+                    metavar='SECONDS',
+                    help="Count and time every WebDriver command by phase "
+                         "(get_slots, navigate_waypoint, ...), logging "
+                         "latency histograms every SECONDS (default: 300) "
+                         "and at exit")
+parser.add_argument('--jobs', metavar='PATH',
+                    help="Run each job in a TOML jobs file (see "
+                         "jobs_template.toml) in its own supervised worker "
+                         "process, with its own Chrome profile and config")
+parser.add_argument('--daemon', action='store_true',
+                    help="Keep the browser open on the slot select page and "
+                         "take commands (see --ctl) over a Unix socket")
+parser.add_argument('--ctl', nargs='+', metavar='COMMAND',
+                    help="Send a command to a running --daemon and print the "
+                         "reply: start, stop, service NAME, "
+                         "prefs [JSON|PATH], checkout, status, metrics or "
+                         "quit")
+parser.add_argument('--socket', default=config.DAEMON_SOCKET, metavar='PATH',
+                    help="The daemon's control socket (default: {})".format(
+                        config.DAEMON_SOCKET
+                    ))
 parser.add_argument('--debug', action='store_true')
 
 
@@ -33,32 +104,50 @@ if __name__ == '__main__':
     args = parser.parse_args()
 
     logging.basicConfig(
-        format='[%(asctime)s] {%(funcName)s} %(levelname)s: %(message)s',
+        format='[%(asctime)s] {%(funcName)s} %(levelname)s: %(message)s'
+               if not args.jobs else
+               '[%(asctime)s] <%(processName)s> {%(funcName)s} '
+               '%(levelname)s: %(message)s',
         datefmt='%Y-%m-%d %H:%M:%S',
         level=logging.INFO if not args.debug else logging.DEBUG
     )
 
-    if not args.no_import:
-        # Import appends ./env/lib/.../chromedriver to $PATH
-        import chromedriver_binary
+    if args.history_report:
+        report(args.history or 'slot_history.db', args.history_report,
+               args.service)
+        parser.exit()
+
+    if args.replay:
+        failures = replay(args.replay, args)
+        parser.exit(1 if failures else 0)
+
+    if args.ctl:
+        command, values = args.ctl[0], args.ctl[1:]
+        try:
+            params = command_params(command, values)
+        except ValueError as e:
+            parser.error(str(e))
+        if command == 'start' and args.checkout:
+            params['checkout'] = True
+        try:
+            response = send_command(args.socket, command, **params)
+        except OSError as e:
+            parser.error("No daemon listening on '{}' ({})".format(
+                args.socket, e
+            ))
+        print(json.dumps(response.get('result', response), indent=2,
+                         default=str))
+        parser.exit(0 if response.get('ok') else 1)
+
+    if args.daemon:
+        run_daemon(args, started=STARTED)
+        parser.exit()
+
+    if args.jobs:
+        jobs, limits = load_jobs(args.jobs)
+        workers = [Worker(job, worker_args(parser, args, job))
+                   for job in jobs]
+        Supervisor(workers, limits).run()
+        parser.exit()
 
-    log.info('Invoking Selenium Chrome webdriver')
-    opts = Options()
-    opts.add_argument("user-data-dir=" + config.USER_DATA_DIR)
-    driver = webdriver.Chrome(options=opts)
-    try:
-        Browser(driver, args).main_loop()
-    except WebDriverException:
-        alert('Encountered an error', 'Basso')
-        if args.debug:
-            dump_source(driver)
-        raise
-    try:
-        # allow time to check out manually
-        min = 15
-        log.info('Sleeping for {} minutes (press Ctrl+C to close)'.format(min))
-        sleep(min*60)
-    except KeyboardInterrupt:
-        log.warning('Slumber disturbed')
-    log.info('Closing webdriver')
-    driver.close()
+    run_browser(args, started=STARTED)
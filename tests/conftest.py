@@ -0,0 +1,63 @@
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from types import SimpleNamespace
+
+import pytest
+
+import deliverance
+from config import BASE_URL
+from deliverance import Browser
+
+from .fake_driver import FakeDriver
+from .fixtures import SERVICE, SLOT_PATH, site_pages
+
+DEFAULT_ARGS = {
+    'service': SERVICE, 'checkout': False, 'ignore_oos': False,
+    'save_cart': False, 'extract': 'element', 'fingerprint': False,
+    'http_poll': False, 'lean': False, 'history': None, 'record': None,
+    'shortcuts': False, 'rate_limit': False, 'debug': False
+}
+
+
+@pytest.fixture
+def make_browser(monkeypatch):
+    """
+    Build Browsers on a FakeDriver, starting at `start` (a path under
+    BASE_URL) of `pages` (default: a Whole Foods site with 4 slots).
+    `prefs` replaces conf.toml's slot preferences, other keyword arguments
+    override the command line options
+    """
+    monkeypatch.setattr(deliverance, 'jitter', lambda seconds: None)
+
+    def make(start=SLOT_PATH, pages=None, prefs=None, **options):
+        args = SimpleNamespace(**dict(DEFAULT_ARGS, **options))
+        driver = FakeDriver(pages or site_pages(SERVICE, n_slots=4),
+                            BASE_URL, start)
+        browser = Browser(driver, args)
+        browser.notifier.close()
+        browser.set_prefs(prefs or {'Any': ['Any']})
+        return browser
+    return make
+
+
+@pytest.fixture
+def server():
+    """A local server answering each request with the next queued status"""
+    class Handler(BaseHTTPRequestHandler):
+        def respond(self):
+            self.server.requests += 1
+            self.send_response(self.server.statuses.pop(0))
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+
+        do_GET = do_POST = respond
+
+        def log_message(self, *args):
+            pass
+
+    httpd = HTTPServer(('127.0.0.1', 0), Handler)
+    httpd.requests = 0
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
@@ -0,0 +1,309 @@
+"""
+In-memory stand-in for a Chrome WebDriver
+
+Serves fixture pages parsed with lxml and answers WebDriver commands
+locally, so the element classes and Browser methods run unmodified while
+every command (each one a round trip to chromedriver in real use) is
+counted. Scripts are dispatched to Python implementations of the JS
+constants used by the package; any other script raises
+"""
+import re
+from collections import Counter
+from itertools import count
+from urllib.parse import urljoin
+
+from lxml import html
+from selenium.common.exceptions import (NoSuchElementException,
+                                        StaleElementReferenceException,
+                                        WebDriverException)
+from selenium.webdriver.common.by import By
+from selenium.webdriver.remote.command import Command
+from selenium.webdriver.remote.webdriver import WebDriver
+from selenium.webdriver.remote.webelement import WebElement
+
+from deliverance.elements import DATE_INDEX_JS
+from deliverance.extract import (EXTRACT_CART_JS, EXTRACT_SLOTS_JS,
+                                 FINGERPRINT_JS)
+from deliverance.replay import CAPTURE_JS
+from deliverance.utils import locator_xpath
+
+USER_AGENT = 'Mozilla/5.0 (FakeDriver)'
+
+
+def inner_text(node):
+    return node.text_content()
+
+
+def djb2(text):
+    """The 32 bit string hash used by FINGERPRINT_JS"""
+    h = 5381
+    for c in text:
+        h = ((h << 5) + h + ord(c)) & 0xFFFFFFFF
+    return h - 2**32 if h & 0x80000000 else h
+
+
+def extract_slots_py(driver, spec):
+    """Python implementation of EXTRACT_SLOTS_JS"""
+    doc = driver.tree
+
+    def text(xpath, ctx):
+        if not xpath:
+            return None
+        nodes = ctx.xpath(xpath)
+        return inner_text(nodes[0]).strip() if nodes else None
+
+    def date_key(value):
+        if not value or not spec['date_id_pattern']:
+            return value or None
+        match = re.search(spec['date_id_pattern'], value)
+        return match.group() if match else None
+
+    date_index = {}
+    for button in doc.xpath(spec['date_index']):
+        key = date_key(button.get(spec['date_index_attr']))
+        date_index.setdefault(key, []).append(button)
+    slots = []
+    for index, slot in enumerate(doc.xpath(spec['slot'])):
+        if spec['date_ancestor']:
+            ancestors = slot.xpath('./ancestor::' + spec['date_ancestor'])
+            date_id = ancestors[0].get('id') if ancestors else None
+        else:
+            date_id = date_key(slot.get('id'))
+        dates = date_index.get(date_id, [])
+        delivery = None
+        if spec['delivery_type_pattern']:
+            match = re.search(spec['delivery_type_pattern'], slot.get('id'))
+            delivery = match.group() if match else None
+        slots.append({
+            'id': slot.get('id') or None,
+            'index': index,
+            'window': text(spec['window'], slot),
+            'price': text(spec['price'], slot),
+            'delivery_type': delivery,
+            'date_id': date_id,
+            'date_count': len(dates),
+            'date_texts': [text(x, dates[0]) for x in spec['date_texts']]
+            if dates else []
+        })
+    return slots
+
+
+def fingerprint_py(driver, specs):
+    """Python implementation of FINGERPRINT_JS"""
+    for slot_type, container, slot in specs:
+        if not driver.tree.xpath(container):
+            continue
+        slots = driver.tree.xpath(slot)
+        text = '||'.join('{}|{}'.format(s.get('id', ''), inner_text(s))
+                         for s in slots)
+        return '{}:{}:{}'.format(slot_type, len(slots), djb2(text))
+    return None
+
+
+def extract_cart_py(driver, spec):
+    """Python implementation of EXTRACT_CART_JS"""
+    def text(xpath, row):
+        nodes = row.xpath(xpath)
+        return inner_text(nodes[0]).strip() if nodes else None
+
+    items = []
+    for row in driver.tree.xpath(spec['row']):
+        links = row.xpath(spec['link'])
+        items.append({
+            'name': text(spec['name'], row),
+            'quantity': text(spec['quantity'], row),
+            'price': text(spec['price'], row),
+            'product_id': row.get('data-asin'),
+            'link': urljoin(driver.base_url + driver.path,
+                            links[0].get('href')) if links else None
+        })
+    return items
+
+
+def date_index_py(driver, nodes, attr):
+    """Python implementation of DATE_INDEX_JS"""
+    return [node.get(attr) for node in nodes]
+
+
+def capture_py(driver, xpaths):
+    """Python implementation of CAPTURE_JS"""
+    nodes = []
+    for xpath in xpaths:
+        for node in driver.tree.xpath(xpath):
+            if not any(n is node or node in n.iterdescendants()
+                       for n in nodes):
+                nodes.append(node)
+    return {'url': driver.base_url + driver.path,
+            'html': [html.tostring(n, encoding='unicode', with_tail=False)
+                     for n in nodes]}
+
+
+SCRIPTS = {
+    EXTRACT_SLOTS_JS: extract_slots_py,
+    EXTRACT_CART_JS: extract_cart_py,
+    FINGERPRINT_JS: fingerprint_py,
+    DATE_INDEX_JS: date_index_py,
+    CAPTURE_JS: capture_py,
+    'arguments[0].scrollIntoView();': lambda driver, node: None,
+    'return navigator.userAgent': lambda driver: USER_AGENT
+}
+
+
+class FakeDriver(WebDriver):
+    """
+    pages: Maps URL paths (relative to base_url) to HTML. Clicking an
+           element with a `data-href` attribute (or inside one) navigates
+           to that path. Unknown paths serve an empty page
+    """
+
+    def __init__(self, pages, base_url, start=''):
+        self.pages = pages
+        self.base_url = base_url
+        self.w3c = False
+        self.session_id = 'fake'
+        self.capabilities = {'browserName': 'fake'}
+        self.cookies = []
+        self.commands = Counter()
+        self._ids = count()
+        self.load(start)
+
+    @property
+    def round_trips(self):
+        return sum(self.commands.values())
+
+    def reset_counts(self):
+        self.commands.clear()
+
+    def load(self, path):
+        """Replace the current page. Elements of the old page go stale"""
+        self.path = path
+        self.source = self.pages.get(path, '<html><body></body></html>')
+        self.tree = html.fromstring(self.source).getroottree()
+        self._nodes = {}
+        self._node_ids = {}
+
+    def node_id(self, node):
+        if node not in self._node_ids:
+            id = 'fake-{}'.format(next(self._ids))
+            self._node_ids[node] = id
+            self._nodes[id] = node
+        return {'ELEMENT': self._node_ids[node]}
+
+    def node(self, id):
+        try:
+            return self._nodes[id]
+        except KeyError:
+            raise StaleElementReferenceException(
+                'Element {} is not attached to the page'.format(id)
+            )
+
+    def find(self, using, value, context=None):
+        if using == By.NAME:
+            xpath = "//*[@name='{}']".format(value)
+        elif using == By.TAG_NAME:
+            xpath = '//' + value
+        else:
+            xpath = locator_xpath((using, value))
+        if context is not None and xpath.startswith('//') and \
+                using != By.XPATH:
+            xpath = '.' + xpath
+        return (context if context is not None else self.tree).xpath(xpath)
+
+    def native(self, value):
+        """Replace WebElements in script arguments with lxml nodes"""
+        if isinstance(value, WebElement):
+            return self.node(value.id)
+        elif isinstance(value, list):
+            return [self.native(v) for v in value]
+        return value
+
+    def to_wire(self, value):
+        if isinstance(value, html.HtmlElement):
+            return self.node_id(value)
+        elif isinstance(value, list):
+            return [self.to_wire(v) for v in value]
+        elif isinstance(value, dict):
+            return {k: self.to_wire(v) for k, v in value.items()}
+        return value
+
+    def click(self, node):
+        while node is not None:
+            if node.get('data-href') is not None:
+                self.load(node.get('data-href'))
+                return
+            node = node.getparent()
+
+    def execute(self, driver_command, params=None):
+        self.commands[driver_command] += 1
+        params = params or {}
+        return {'value': self._unwrap_value(
+            self.to_wire(self.dispatch(driver_command, params))
+        )}
+
+    def dispatch(self, command, params):
+        if command == Command.GET:
+            url = params['url']
+            if not url.startswith(self.base_url):
+                raise WebDriverException('Unknown URL: {}'.format(url))
+            self.load(url[len(self.base_url):])
+        elif command == Command.REFRESH:
+            self.load(self.path)
+        elif command == Command.GET_CURRENT_URL:
+            return self.base_url + self.path
+        elif command == Command.GET_PAGE_SOURCE:
+            return self.source
+        elif command == Command.GET_TITLE:
+            return self.tree.findtext('.//title') or ''
+        elif command == Command.GET_ALL_COOKIES:
+            return [dict(c) for c in self.cookies]
+        elif command in (Command.CLOSE, Command.QUIT):
+            return None
+        elif command in (Command.FIND_ELEMENT, Command.FIND_ELEMENTS):
+            nodes = self.find(params['using'], params['value'])
+            return self.single(nodes, params) \
+                if command == Command.FIND_ELEMENT else nodes
+        elif command in (Command.FIND_CHILD_ELEMENT,
+                         Command.FIND_CHILD_ELEMENTS):
+            nodes = self.find(params['using'], params['value'],
+                              self.node(params['id']))
+            return self.single(nodes, params) \
+                if command == Command.FIND_CHILD_ELEMENT else nodes
+        elif command == Command.EXECUTE_SCRIPT:
+            try:
+                handler = SCRIPTS[params['script']]
+            except KeyError:
+                raise WebDriverException('No fake for script: {}'.format(
+                    params['script'][:80]
+                ))
+            return handler(self, *self.native(params['args']))
+        else:
+            return self.element_command(command, self.node(params['id']),
+                                        params)
+
+    def single(self, nodes, params):
+        if not nodes:
+            raise NoSuchElementException('No element found for {}'.format(
+                params['value']
+            ))
+        return nodes[0]
+
+    def element_command(self, command, node, params):
+        if command == Command.GET_ELEMENT_ATTRIBUTE:
+            name = params['name']
+            if name in ('innerText', 'textContent'):
+                return inner_text(node)
+            return node.get(name)
+        elif command == Command.GET_ELEMENT_TEXT:
+            return inner_text(node).strip()
+        elif command == Command.GET_ELEMENT_TAG_NAME:
+            return node.tag
+        elif command == Command.IS_ELEMENT_DISPLAYED:
+            return True
+        elif command == Command.IS_ELEMENT_ENABLED:
+            return node.get('disabled') is None
+        elif command == Command.CLICK_ELEMENT:
+            self.click(node)
+        else:
+            raise WebDriverException(
+                "Command '{}' isn't supported by FakeDriver".format(command)
+            )
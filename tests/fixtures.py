@@ -0,0 +1,180 @@
+"""
+Synthetic DOM fixtures mirroring the structure matched by the locators in
+config.py and the element classes in deliverance.elements
+"""
+from datetime import date, timedelta
+
+DAYS = ['Today', 'Tomorrow', 'Wednesday', 'Thursday', 'Friday', 'Saturday',
+        'Sunday']
+START = date(2020, 4, 1)
+SERVICE = 'Whole Foods'
+SLOT_PATH = 'gp/buy/shipoptionselect/handlers/display.html'
+PAYSELECT = 'gp/buy/payselect/handlers/display.html'
+SPC = 'gp/buy/spc/handlers/display.html'
+THANK_YOU = 'gp/buy/thankyou/handlers/display.html'
+
+
+def window(i):
+    hour = 6 + (i * 2) % 16
+    return '{}:00 {} - {}:00 {}'.format(
+        hour % 12 or 12, 'AM' if hour < 12 else 'PM',
+        (hour + 2) % 12 or 12, 'AM' if hour + 2 < 12 else 'PM'
+    )
+
+
+def page(body):
+    return '<html><head><title>Fixture</title></head><body>{}</body></html>' \
+        .format(body)
+
+
+def single_slot_page(n_slots, n_days=3):
+    """Slot select page using the single delivery option layout"""
+    buttons = []
+    groups = []
+    for d in range(n_days):
+        date_id = 'ufss-date-{}'.format(d)
+        buttons.append(
+            '<button name="{}" class="ufss-date-select-toggle">'
+            '<span class="day-of-week">{}</span>'
+            '<span class="month-day">{}</span></button>'.format(
+                date_id, DAYS[d % len(DAYS)],
+                (START + timedelta(days=d)).strftime('%B %d')
+            )
+        )
+        slots = []
+        for i in range(d, n_slots, n_days):
+            slots.append(
+                '<div class="ufss-slot ufss-available" id="slot-{i}">'
+                '<span class="ufss-slot-time-window-text">{w}</span>'
+                '<span class="ufss-slot-price-text">FREE</span>'
+                '<button class="ufss-slot-toggle-native-button">Select'
+                '</button></div>'.format(i=i, w=window(i))
+            )
+        slots.append('<div class="ufss-slot ufss-unavailable">'
+                     '<span class="ufss-slot-time-window-text">{}</span>'
+                     '</div>'.format(window(n_slots)))
+        groups.append(
+            '<div class="ufss-slotselect ufss-date-group" id="{}">{}</div>'
+            .format(date_id, ''.join(slots))
+        )
+    return page(
+        '<div class="ufss-slotselect-container">'
+        '<div class="ufss-date-select">{}</div>{}'
+        '<span class="ufss-overview-continue-button" data-href="{}">'
+        'Continue</span>'
+        '</div>'.format(''.join(buttons), ''.join(groups), PAYSELECT)
+    )
+
+
+def multi_slot_page(n_slots, n_days=3):
+    """Slot select page using the multiple delivery option layout"""
+    buttons = []
+    slots = []
+    for d in range(n_days):
+        day = (START + timedelta(days=d)).isoformat()
+        buttons.append(
+            '<button id="date-button-{}-announce">'
+            '<span class="a-size-base-plus date-button-text">{}</span>'
+            '<span class="calendar-date-text">{}</span></button>'.format(
+                day, DAYS[d % len(DAYS)],
+                (START + timedelta(days=d)).strftime('%b %d')
+            )
+        )
+    for i in range(n_slots):
+        day = (START + timedelta(days=i % n_days)).isoformat()
+        kind = 'UNATTENDED' if i % 2 else 'ATTENDED'
+        slots.append(
+            '<div id="slot-button-root-{}-{}-{}" class="slot-button">'
+            '<span class="a-radio-label slotRadioLabel">{}</span></div>'
+            .format(day, kind, i, window(i))
+        )
+    slots.append('<div id="slot-button-root-{}-ATTENDED-x" '
+                 'class="slot-button disabled"></div>'.format(START))
+    return page(
+        '<div id="slot-container-root">'
+        '<button id="selector-button-attended">Attended</button>'
+        '<button id="selector-button-unattended">Unattended</button>'
+        '{}{}<input class="a-button-text a-declarative" type="submit" '
+        'data-href="{}"></div>'.format(''.join(buttons), ''.join(slots),
+                                       PAYSELECT)
+    )
+
+
+def slot_page(slot_type, n_slots, n_days=3):
+    if slot_type == 'multi':
+        return multi_slot_page(n_slots, n_days)
+    return single_slot_page(n_slots, n_days)
+
+
+def cart_page(n_items):
+    items = []
+    for i in range(n_items):
+        items.append(
+            '<div class="a-row sc-list-item sc-java-remote-feature" '
+            'data-asin="B{:09d}">'
+            '<span class="a-truncate sc-product-title">Item {}</span>'
+            '<span class="qs-widget-container">{}</span>'
+            '<span class="a-color-price sc-price sc-white-space-nowrap">'
+            '${}.99</span>'
+            '<a class="a-link-normal sc-product-link" href="/dp/B{:09d}">'
+            'link</a></div>'.format(i, i, i % 4 + 1, i % 20 + 1, i)
+        )
+    if not items:
+        return page('<div class="a-row sc-your-amazon-cart-is-empty">'
+                    '<h2>Your Whole Foods Market Cart is empty</h2></div>')
+    return page('<div data-name="Active Items">{}</div>'.format(
+        ''.join(items)
+    ))
+
+
+def payment_page(n_cards):
+    rows = []
+    for i in range(n_cards):
+        rows.append(
+            '<div class="payment-row pmts-instrument-row">'
+            '<input type="radio" name="ppw-instrumentRowSelection">'
+            '<span class="pmts-cc-detail card-info">Visa ending in {:04d}'
+            '</span></div>'.format(1000 + i)
+        )
+    return page('<div>{}<input id="continue-top" type="submit" '
+                'data-href="{}"></div>'.format(''.join(rows), SPC))
+
+
+def link(tag, attrs, href, text=''):
+    """A clickable element. The fake WebDriver navigates to `data-href`"""
+    return '<{0} {1} data-href="{2}">{3}</{0}>'.format(tag, attrs, href, text)
+
+
+def site_pages(service='Whole Foods', slot_type='single', n_slots=10,
+               n_items=10, n_cards=3):
+    """
+    Map URL paths (relative to BASE_URL) to pages for the SLOT_SELECT route,
+    the cart endpoints and the payment page
+    """
+    cart = cart_page(n_items).replace(
+        '</body>',
+        link('span', 'class="a-button"', 'alm/byg',
+             '<span>Checkout {} Cart</span>'.format(service)) + '</body>'
+    )
+    return {
+        '': page(
+            '<a id="nav-link-accountList">Hello, Jane</a>'
+            + link('a', 'id="nav-cart"', 'gp/cart/view.html', 'Cart')
+        ),
+        'gp/cart/view.html': cart,
+        'cart/localmarket': cart,
+        'cart/fresh': cart,
+        'alm/byg': page(link('span', 'class="a-button byg-continue-button"',
+                             'alm/substitution', 'Continue')),
+        'alm/substitution': page(link(
+            'input', 'id="subsContinueButton" type="submit"',
+            'gp/buy/shipoptionselect/handlers/display.html'
+        )),
+        'gp/buy/shipoptionselect/handlers/display.html': slot_page(
+            slot_type, n_slots
+        ).replace('<body>', '<body><h1>{} delivery</h1>'.format(service)),
+        PAYSELECT: payment_page(n_cards),
+        SPC: page(link('input', 'class="a-button-text place-your-order-button"'
+                       ' type="submit"', THANK_YOU)),
+        THANK_YOU: page('Thank you, your order has been placed')
+    }
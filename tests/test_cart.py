@@ -0,0 +1,63 @@
+import json
+
+import pytest
+
+import deliverance
+from deliverance.cart_store import CartStore
+
+from .fixtures import SERVICE, site_pages
+
+
+def saved(path):
+    with open(path, encoding='utf-8') as f:
+        return [json.loads(line) for line in f]
+
+
+@pytest.fixture
+def history(tmp_path, monkeypatch):
+    path = str(tmp_path / 'cart.jsonl')
+    monkeypatch.setattr(deliverance, 'CART_HISTORY_PATH', path)
+    return path
+
+
+@pytest.mark.parametrize('extract', ['element', 'script', 'lxml'])
+def test_items_missing_fields_are_kept(make_browser, history, extract):
+    pages = site_pages(SERVICE, n_items=2)
+    # No price or link on the first item
+    for part in ['<span class="a-color-price sc-price sc-white-space-nowrap">'
+                 '$1.99</span>',
+                 '<a class="a-link-normal sc-product-link" '
+                 'href="/dp/B000000000">link</a>']:
+        pages['cart/localmarket'] = pages['cart/localmarket'].replace(part, '')
+    browser = make_browser('', pages=pages, extract=extract)
+    browser.save_cart()
+    browser.save_cart()
+
+    records = saved(history)
+    assert [r['change'] for r in records] == ['added', 'added']
+    first = [r for r in records if r['product_id'] == 'B000000000'][0]
+    assert (first['price'], first['link']) == (None, None)
+
+
+def test_empty_cart_is_saved(make_browser, history):
+    browser = make_browser('', pages=site_pages(SERVICE, n_items=2))
+    browser.save_cart()
+    browser.driver.pages['cart/localmarket'] = site_pages(
+        SERVICE, n_items=0
+    )['cart/localmarket']
+    browser.save_cart()
+
+    assert [r['change'] for r in saved(history)] == ['added'] * 2 + \
+        ['removed'] * 2
+    assert CartStore(history).current(SERVICE) == []
+
+
+def test_item_without_asin_is_keyed_by_name(tmp_path):
+    store = CartStore(str(tmp_path / 'cart.jsonl'))
+    item = {'name': 'Bananas', 'product_id': None, 'quantity': '1',
+            'price': None, 'link': None}
+    assert [c['change'] for c in store.update(SERVICE, [item])] == ['added']
+    assert store.update(SERVICE, [item]) == []
+    assert store.update(SERVICE, [dict(item, quantity='2')])[0]['change'] \
+        == 'changed'
+    assert CartStore(store.path).current(SERVICE)[0]['quantity'] == '2'
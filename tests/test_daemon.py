@@ -0,0 +1,42 @@
+from deliverance.daemon import Daemon, send_command
+
+
+def test_malformed_prefs_are_rejected(make_browser):
+    browser = make_browser()
+    daemon = Daemon(browser)
+    prefs = {'Sunday': ['Any']}
+    assert daemon.run_command('prefs', {'prefs': prefs})['ok']
+
+    for bad in [['Sunday'], {'Sunday': 'Any'}, {'Sunday': [1]}, 'Any']:
+        response = daemon.run_command('prefs', {'prefs': bad})
+        assert not response['ok']
+        assert browser.prefs_override == prefs
+        assert browser.slot_prefs == ['sunday']
+
+
+def test_checkout_polls_before_reading_slots(make_browser, monkeypatch):
+    browser = make_browser()
+    daemon = Daemon(browser)
+    daemon.prepared = True
+    polls = []
+    monkeypatch.setattr(browser, 'poll', lambda: polls.append(1) or [])
+
+    response = daemon.run_command('checkout', {})
+    assert response['result'] == {'checked_out': False,
+                                  'reason': 'No slots available'}
+    assert polls == [1]
+
+
+def test_malformed_commands_are_rejected(make_browser, tmp_path):
+    browser = make_browser()
+    path = str(tmp_path / 'd.sock')
+    daemon = Daemon(browser, path)
+    daemon.listen()
+    try:
+        assert send_command(path, 5, timeout=5) == {
+            'ok': False, 'error': 'Malformed request'
+        }
+    finally:
+        daemon.server.shutdown()
+        daemon.server.server_close()
+    assert not daemon.run_command(5, {})['ok']
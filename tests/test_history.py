@@ -0,0 +1,65 @@
+import sqlite3
+
+from deliverance.history import SlotHistory
+
+
+def observations(path):
+    with sqlite3.connect(path) as conn:
+        return conn.execute(
+            'SELECT date, window, price, seen FROM observation ORDER BY ts'
+        ).fetchall()
+
+
+def test_unchanged_page_keeps_slots_seen(make_browser, tmp_path):
+    # Matches none of the fixture slots, so the element mode result is
+    # empty and the fingerprint is reused on the next poll
+    browser = make_browser(prefs={'Sunday': ['Any']}, fingerprint=True)
+    browser.history = SlotHistory(str(tmp_path / 'h.db'))
+
+    assert browser.get_slots() == []
+    browser.refresh()
+    assert browser.get_slots() == []
+    assert browser.skip_stats.skipped == 1
+    browser.history.close()
+
+    rows = observations(str(tmp_path / 'h.db'))
+    assert len(rows) == 8
+    assert all(seen == 1 for *_, seen in rows)
+
+
+def test_element_slots_recorded_without_round_trips(make_browser, tmp_path):
+    browser = make_browser()
+    browser.get_slots()
+    commands = sum(browser.driver.commands.values())
+
+    browser = make_browser()
+    browser.history = SlotHistory(str(tmp_path / 'h.db'))
+    slots = browser.get_slots()
+    assert sum(browser.driver.commands.values()) == commands
+    browser.history.close()
+
+    rows = observations(str(tmp_path / 'h.db'))
+    assert [(d, w) for d, w, _, _ in rows] == [
+        tuple(s.full_name.split('::')) for s in slots
+    ]
+
+
+def test_http_hand_off_recorded_once(make_browser, tmp_path):
+    browser = make_browser('', extract='lxml')
+    browser.history = SlotHistory(str(tmp_path / 'h.db'))
+    records = make_browser(extract='lxml').get_slots()
+
+    class Poller:
+        ready = True
+        slot_path = 'gp/buy/shipoptionselect/handlers/display.html'
+
+        def get_slots(self, driver):
+            return records
+
+    browser.http_poller = Poller()
+    assert len(browser.poll_http()) == len(records)
+    browser.history.close()
+
+    rows = observations(str(tmp_path / 'h.db'))
+    assert len(rows) == len(records)
+    assert all(price is not None for _, _, price, _ in rows)
@@ -0,0 +1,17 @@
+import pytest
+
+from config import SiteConfig
+from deliverance.exceptions import PollThrottled
+from deliverance.http_poll import HttpPoller
+
+from .fixtures import SERVICE
+
+
+@pytest.mark.parametrize('status', [429, 503])
+def test_throttle_status_is_not_retried(server, status):
+    server.statuses = [status, 200]
+    poller = HttpPoller(SiteConfig(SERVICE), base_url='http://127.0.0.1:{}/'
+                        .format(server.server_port))
+    with pytest.raises(PollThrottled):
+        poller.get_slots()
+    assert server.requests == 1
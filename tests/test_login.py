@@ -0,0 +1,22 @@
+from .fixtures import SERVICE, site_pages
+
+COOKIES = [{'name': 'x-main', 'value': 'a'}, {'name': 'at-main', 'value': 'b'}]
+
+
+def test_login_cookies_are_not_proof(make_browser):
+    pages = site_pages(SERVICE)
+    pages[''] = pages[''].replace('Hello, Jane', 'Hello, Sign in')
+    browser = make_browser('', pages=pages)
+    browser.driver.cookies = COOKIES
+    assert not browser.is_logged_in()
+
+
+def test_auth_page_invalidates_cached_login(make_browser):
+    browser = make_browser('')
+    browser.driver.cookies = COOKIES
+    assert browser.is_logged_in()
+    assert browser.login.state
+
+    browser.driver.get(browser.site_config.BASE_URL + 'ap/signin')
+    browser.current_url
+    assert browser.login.state is None
@@ -0,0 +1,26 @@
+import pytest
+import requests
+from requests.adapters import HTTPAdapter
+
+from deliverance.notify import message_retry
+
+
+def send(server, method):
+    session = requests.Session()
+    session.mount('http://', HTTPAdapter(max_retries=message_retry()))
+    url = 'http://127.0.0.1:{}/'.format(server.server_port)
+    return session.request(method, url, timeout=5)
+
+
+@pytest.mark.parametrize('method', ['GET', 'POST'])
+def test_message_not_resent_after_server_error(server, method):
+    server.statuses = [502, 200]
+    assert send(server, method).status_code == 502
+    assert server.requests == 1
+
+
+@pytest.mark.parametrize('method', ['GET', 'POST'])
+def test_message_resent_when_rate_limited(server, method):
+    server.statuses = [429, 200]
+    assert send(server, method).status_code == 200
+    assert server.requests == 2
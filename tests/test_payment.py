@@ -0,0 +1,16 @@
+import pytest
+from lxml import html
+
+from config import Locators
+from deliverance.elements import PaymentRow
+
+from .fixtures import payment_page
+
+
+@pytest.mark.parametrize('card_number, found', [
+    ('1001', 1), ("10'01", 0), ('10"01', 0), ("1' or '1", 0)
+])
+def test_radio_xpath_quotes_card_number(card_number, found):
+    tree = html.fromstring(payment_page(3))
+    xpath = PaymentRow.radio_xpath(Locators.PAYMENT_ROW[1], card_number)
+    assert len(tree.xpath(xpath)) == found
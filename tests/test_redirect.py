@@ -0,0 +1,13 @@
+from types import SimpleNamespace
+
+from deliverance.utils import url_excludes
+
+
+def test_url_excludes_ignores_query_string():
+    condition = url_excludes('throttle.html')
+    driver = SimpleNamespace(
+        current_url='https://www.amazon.com/gp/cart/view.html?r=throttle.html'
+    )
+    assert condition(driver)
+    driver.current_url = 'https://www.amazon.com/throttle.html?r=1'
+    assert not condition(driver)
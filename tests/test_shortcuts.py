@@ -0,0 +1,20 @@
+from deliverance.shortcuts import ShortcutStore
+
+
+def test_shortcut_needs_the_current_service(make_browser, tmp_path):
+    browser = make_browser()
+    browser.shortcuts = ShortcutStore(str(tmp_path / 'shortcuts.json'))
+    assert browser.try_shortcut(browser.routes['SLOT_SELECT'])
+
+    # Still on the Whole Foods slot page
+    browser.set_service('Amazon Fresh')
+    assert not browser.try_shortcut(browser.routes['SLOT_SELECT'])
+
+
+def test_other_service_page_fails_the_shortcut(make_browser, tmp_path):
+    browser = make_browser('')
+    browser.shortcuts = ShortcutStore(str(tmp_path / 'shortcuts.json'))
+    browser.set_service('Amazon Fresh')
+    assert not browser.try_shortcut(browser.routes['SLOT_SELECT'])
+    entry = browser.shortcuts.entry('Amazon Fresh', 'SLOT_SELECT')
+    assert (entry['ok'], entry['failed']) == (0, 1)
@@ -0,0 +1,18 @@
+from deliverance.supervisor import Job, worker_args
+from run import parser
+
+
+def test_worker_args_inherit_command_line_options():
+    args = parser.parse_args(['--jobs', 'jobs.toml', '--debug',
+                              '--no-rate-limit', '--instrument', '60'])
+    job = Job('fresh', 'Amazon Fresh', 'profile', 'conf.toml',
+              ['--lean', '--instrument', '30'])
+    job_args = worker_args(parser, args, job)
+
+    assert job_args.service == 'Amazon Fresh'
+    assert job_args.debug and job_args.lean
+    assert not job_args.rate_limit
+    assert job_args.instrument == 30
+    assert job_args.jobs is None
+    # The supervisor's own options are left alone
+    assert args.service == 'Whole Foods' and not args.lean